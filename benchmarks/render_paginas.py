@@ -0,0 +1,60 @@
+"""
+Páginas/segundo del render de tareas: recorrido con df.iterrows() (una
+Series por fila, como antes) contra tareas_desde_df (itertuples + Tarea).
+
+    python benchmarks/render_paginas.py --tareas 10000
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from flipbook_datos import AccesoDatos, obtener_tareas
+from flipbook_fuentes import FuenteSQLite, crear_dwh_local
+from flipbook_layouts import CAMPOS_TAREA, Tarea, planear_paginas, tareas_desde_df
+
+logger = logging.getLogger(__name__)
+
+
+def tareas_iterrows(df):
+    """Camino anterior: una Series por fila y row['...'] por cada campo"""
+    for _, row in df.iterrows():
+        yield Tarea(*(row[campo] for campo in CAMPOS_TAREA))
+
+
+def renderizar(tareas, plan):
+    return [layout_func(tarea, img_url) for tarea, (layout_func, img_url) in zip(tareas, plan)]
+
+
+def medir(nombre, df, recorrido, repeticiones):
+    plan = planear_paginas(df["Tarea_Project_Key"], ["img/foto.jpg"])
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        paginas = renderizar(recorrido(df), plan)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    logger.info(f"{nombre:<14} {len(paginas) / mejor:>10,.0f} páginas/s ({mejor:.3f}s)")
+    return paginas
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tareas", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--dwh", default=".cache/bench_dwh.sqlite")
+    args = parser.parse_args()
+
+    crear_dwh_local(args.dwh, args.tareas)
+    datos = AccesoDatos(FuenteSQLite(args.dwh), snapshot_dir=None)
+    # Todas las jefaturas, para tener las --tareas completas
+    df = obtener_tareas(datos, jefatura=[1, 2, 3])
+    logger.info(f"📊 {len(df)} tareas sintéticas")
+
+    antes = medir("iterrows", df, tareas_iterrows, args.repeticiones)
+    despues = medir("tareas_desde_df", df, tareas_desde_df, args.repeticiones)
+    assert antes == despues, "Los dos recorridos deben producir el mismo HTML"
@@ -1,98 +1,47 @@
-import pandas as pd
-from sqlalchemy import create_engine, text
+import argparse
+import json
 import logging
 import random
 import os
-from pathlib import Path
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from flipbook_datos import (
+    AccesoDatos, obtener_tareas, obtener_tareas_por_bloques,
+    obtener_estadisticas, generar_estadisticas,
+)
+from flipbook_estadisticas import AcumuladorEstadisticas
+from flipbook_layouts import (
+    tareas_desde_df, planear_paginas, renderizar_paginas, archivos_render, cajas_imagen,
+)
+from flipbook_plantillas import cargar_plantilla
+from flipbook_cache import CachePaginas
+from flipbook_imagenes import (
+    CAJA_LIBRO, CAJA_PAGINA, catalogo_imagenes, derivar_imagenes, imagen_original, imagenes_fijas,
+)
+from flipbook_salida import (
+    RECURSOS_ESTATICOS, HuellaFilas, PlanPaginas, huella_build, build_actualizado,
+    guardar_manifiesto, guardar_plan, SalidaHTML,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # -------------------------
-# 1. Conectar a la BD
+# 1. Obtener imágenes aleatorias
 # -------------------------
-def conectar_db():
-    connection_string = (
-        r'mssql+pyodbc:///?odbc_connect='
-        r'Driver={SQL Server};'
-        r'Server=PSR-S670-N\BIGDATA;'
-        r'Database=DWH_INCOLMOTOS;'
-        r'Trusted_Connection=yes'
-    )
-    engine = create_engine(connection_string)
-    return engine
-
-
-COLORES_DEPOSITO = {
-    1: "#FF0000",
-    2: "#0A2D82",
-    3: "#616365",
-    4: "#BCBDBC",
-    5: "#FF6A00"
-}
-
-
-# -------------------------
-# 2. Obtener los datos
-# -------------------------
-
-
-def color_por_deposito(deposito_key):
-    return COLORES_DEPOSITO.get(deposito_key, "#999999")
-
-
-
-def obtener_tareas(engine):
-    query = """
-    SELECT 
-        T.Tarea_Project_Key,
-        T.Project_Project_Key,
-        T.Jefatura_Project_Key,
-        T.Codigo_Esquema_Tarea,
-        T.Codigo_Tarea,
-        T.Nombre_Tarea_Project,
-        T.Descripcion_Tarea_Project,
-        T.Estado_Tarea_Project_key,
-        T.Objs_Estrat_Area_Project_Key,
-        T.Objs_Div_TI_Project_Key,
-        T.Gcia_Project_Key,
-        T.Categoria_YMC_key,
-        T.Codigo_MTP_key,
-        T.Porcentaje_Ejecucion,
-        T.Deposito_Project_Key,
-        T.Fecha_Inicio,
-        T.Fecha_Fin,
-        T.Fecha_Estimada_Entrega,
-        T.Notas_IA_Project,
-        D.Nombre_Deposito_Project,
-        G.Nom_Gcia_Project,
-        E.Nom_Estado_Tarea_Project
-    FROM [DWH_INCOLMOTOS].[ti].[Dim_Tareas_Project] T
-    LEFT JOIN [DWH_INCOLMOTOS].[ti].[Dim_Depositos_Project] D
-        ON T.Deposito_Project_Key = D.Deposito_Project_Key
-    LEFT JOIN [DWH_INCOLMOTOS].[ti].[Dim_Gcias_Involucradas_Project] G
-        ON T.Gcia_Project_Key = G.Gcia_Project_Key
-    LEFT JOIN [DWH_INCOLMOTOS].[ti].[Dim_Estado_Tareas_Project] E
-        ON T.Estado_Tarea_Project_key = E.Estado_Tarea_Project_key
-    WHERE T.Jefatura_Project_Key = 2
+def obtener_imagenes_aleatorias(carpeta_img="img", cantidad=None, derivadas=True):
     """
-    df = pd.read_sql(query, engine)
-    return df
-
-# -------------------------
-# 3. Obtener imágenes aleatorias
-# -------------------------
-def obtener_imagenes_aleatorias(carpeta_img="img", cantidad=None):
-    """
-    Obtiene lista de imágenes de la carpeta especificada
+    Obtiene lista de imágenes de la carpeta especificada, según su catálogo
+    (ver flipbook_imagenes: solo se leen los archivos nuevos o modificados).
+    Con ``derivadas`` cada imagen es una ImagenResponsiva recortada a la
+    medida de cada layout en el que puede ir (por proporción y resolución).
     """
-    extensiones = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-    imagenes = []
-    
-    if os.path.exists(carpeta_img):
-        for archivo in os.listdir(carpeta_img):
-            if any(archivo.lower().endswith(ext) for ext in extensiones):
-                imagenes.append(f"../{carpeta_img}/{archivo}")
+    # En orden por nombre: el plan de imágenes no depende del sistema de archivos
+    entradas = [entrada for entrada in catalogo_imagenes(carpeta_img) if entrada.es_imagen]
+
+    variantes = derivar_imagenes(entradas, cajas_imagen()) if derivadas else {}
+    imagenes = [variantes.get(entrada.ruta) or imagen_original(entrada) for entrada in entradas]
     
     if not imagenes:
         logger.warning(f"No se encontraron imágenes en {carpeta_img}")
@@ -104,57 +53,64 @@ def obtener_imagenes_aleatorias(carpeta_img="img", cantidad=None):
     
     return imagenes
 
-# -------------------------
-# 4. Calcular estadísticas
-# -------------------------
-def generar_estadisticas(df):
-    total_tareas = len(df)
-    
-    # Agrupaciones
-    por_deposito = df.groupby("Nombre_Deposito_Project").size().to_dict()
-    por_gerencia = df.groupby("Nom_Gcia_Project").size().to_dict()
-    por_estado = df.groupby("Nom_Estado_Tarea_Project").size().to_dict()
-    
-    estadisticas = {
-        "total_tareas": total_tareas,
-        "por_deposito": por_deposito,
-        "por_gerencia": por_gerencia,
-        "por_estado": por_estado,
-    }
-    return estadisticas
+
+# Imágenes de la portada y de la página 2, con la caja que ocupan
+IMAGENES_FIJAS = {
+    "portada": ("img/Portada.JPEG", CAJA_LIBRO),
+    "foto": ("img/IMG_0283.JPEG", CAJA_PAGINA),
+}
+
+
+def obtener_imagenes_fijas(derivadas=True):
+    """{nombre: ImagenPagina} de las páginas fijas (ver IMAGENES_FIJAS)"""
+    return imagenes_fijas(IMAGENES_FIJAS, derivadas=derivadas)
+
 
 # -------------------------
-# 5. Generadores de layouts
+# 2. Páginas fijas (layouts de tareas en flipbook_layouts.py)
 # -------------------------
 
 
-def pagina_foto():
-    return """
-    <div class="page foto-fija-page">
-        <img src="../img/img_0283.jpeg" alt="Fondo">
+def pagina_foto(imagen):
+    return f"""
+    <div class="page foto-fija-page" style="{imagen.fondo}">
+        <img src="{imagen}" srcset="{imagen.srcset}" sizes="{imagen.sizes}"
+             width="{imagen.ancho}" height="{imagen.alto}" alt="Fondo">
     </div>
     """
 
 
-def pagina_tabla_contenido(df):
-    items = ""
+# Entradas por página del índice; con más tareas el índice ocupa varias páginas
+ENTRADAS_POR_PAGINA_TOC = int(os.environ.get("FLIPBOOK_ENTRADAS_TOC", 18))
+
+
+def entrada_tabla_contenido(tarea):
+    """Lo que muestra el índice de una tarea (solo texto, se puede guardar en disco)"""
+    return (
+        tarea.color,
+        str(tarea.Nombre_Tarea_Project),
+        str(tarea.Nombre_Deposito_Project),
+        str(tarea.Nom_Gcia_Project),
+    )
 
-    for _, row in df.iterrows():
-        color = COLORES_DEPOSITO.get(row["Deposito_Project_Key"], "#999999")
 
-        items += f"""
-        <div class="toc-item">
+def item_tabla_contenido(entrada, pagina):
+    color, nombre, deposito, gerencia = entrada
+    return f"""
+        <div class="toc-item" data-pagina="{pagina}">
             <span class="toc-dot" style="background:{color}"></span>
             <div class="toc-text">
-                <div class="toc-title">{row['Nombre_Tarea_Project']}</div>
+                <div class="toc-title">{nombre}</div>
                 <div class="toc-meta">
-                    {row['Nombre_Deposito_Project']} · {row['Nom_Gcia_Project']}
+                    {deposito} · {gerencia}
                 </div>
             </div>
+            <span class="toc-page-num">{pagina}</span>
         </div>
         """
 
-    return f"""
+
+TOC_INICIO = """
     <div class="page toc-page">
         <div class="toc-container">
             <h2>TABLA DE CONTENIDO</h2>
@@ -162,380 +118,92 @@ def pagina_tabla_contenido(df):
                 Proyectos incluidos en el informe
             </div>
             <div class="toc-list">
-                {items}
+                """
+
+TOC_CONTINUACION = """
+    <div class="page toc-page">
+        <div class="toc-container">
+            <h2>TABLA DE CONTENIDO</h2>
+            <div class="toc-subtitle">
+                (continuación)
+            </div>
+            <div class="toc-list">
+                """
+
+TOC_FIN = """
             </div>
         </div>
     </div>
     """
 
 
+def total_paginas_toc(total_tareas, capacidad=ENTRADAS_POR_PAGINA_TOC):
+    return max(1, -(-total_tareas // capacidad))
 
 
-
-def layout_left_text(row, img_url):
-    """Layout con texto a la izquierda e imagen a la derecha"""
-    return f"""
-    <div class="double layout-left-text">
-        <div class="text-column">
-            <div class="text-content">
-                <div class="accent-line"></div>
-                <div class="task-code">{row['Codigo_Tarea']}</div>
-                <h2>{row['Nombre_Tarea_Project']}</h2>
-                <div class="task-info">
-                    <div class="task-label">Depósito</div>
-                    <div class="task-value">{row['Nombre_Deposito_Project']}</div>
-                </div>
-                <div class="task-info">
-                    <div class="task-label">Gerencia</div>
-                    <div class="task-value">{row['Nom_Gcia_Project']}</div>
-                </div>
-                <div class="progress-bar">
-                    <div class="progress-fill" style="width: {row['Porcentaje_Ejecucion']*100}%"></div>
-                </div>
-                <div class="percentage-badge">{row['Porcentaje_Ejecucion']*100:.0f}%</div>
-                <div class="task-info">
-                    <div class="date-display">Inicio: {row['Fecha_Inicio']}</div>
-                    <div class="date-display">Fin: {row['Fecha_Fin']}</div>
-                </div>
-            </div>
-        </div>
-        <div class="image-column">
-            <img src="{img_url}" alt="Background">
-        </div>
-    </div>
+def paginas_tabla_contenido(entradas, primera_pagina, capacidad=ENTRADAS_POR_PAGINA_TOC):
     """
-
-def layout_right_text(row, img_url):
-    """Layout con texto a la derecha e imagen a la izquierda"""
-    return f"""
-    <div class="double layout-right-text">
-        <div class="text-column">
-            <div class="text-content">
-                <h2>{row['Nombre_Tarea_Project']}</h2>
-                <div class="divider"></div>
-                <div class="task-label">Código: {row['Codigo_Tarea']}</div>
-                <div class="task-info">
-                    <strong>Estado:</strong> {row['Nom_Estado_Tarea_Project']}
-                </div>
-                <div class="task-info">
-                    <strong>Notas:</strong><br>{str(row['Notas_IA_Project'] or '')[:100]}
-                </div>
-                <div class="task-info">
-                    <strong>Progreso:</strong> {row['Porcentaje_Ejecucion']*100:.0f}%
-                </div>
-                <div class="task-info">
-                    <div class="date-display">Entrega: {row['Fecha_Estimada_Entrega']}</div>
-                </div>
-            </div>
-        </div>
-        <div class="image-column">
-            <img src="{img_url}" alt="Background">
-        </div>
-    </div>
+    Entrega el HTML de cada página del índice, con ``capacidad`` entradas
+    por página. La i-ésima entrada apunta a la página ``primera_pagina + i``
+    del libro (numeración de turn.js, desde 1).
     """
+    items = []
+    encabezado = TOC_INICIO
 
-def layout_diagonal(row, img_url):
-    """Layout con división diagonal"""
-    return f"""
-    <div class="double layout-diagonal">
-        <div class="diagonal-bg"></div>
-        <div class="content-wrapper">
-            <div class="text-section">
-                <div class="task-code" style="color: var(--accent-red);">{row['Codigo_Tarea']}</div>
-                <h2>{row['Nombre_Tarea_Project']}</h2>
-                <div class="task-info">
-                    <strong>Depósito:</strong> {row['Nombre_Deposito_Project']}
-                </div>
-                <div class="task-info">
-                    <strong>Gerencia:</strong> {row['Nom_Gcia_Project']}
-                </div>
-                <div class="percentage-badge">{row['Porcentaje_Ejecucion']*100:.0f}% Completado</div>
-            </div>
-            <div class="image-section">
-                <img src="{img_url}" alt="Background">
-            </div>
-        </div>
-    </div>
-    """
+    for i, entrada in enumerate(entradas):
+        items.append(item_tabla_contenido(entrada, primera_pagina + i))
+        if len(items) == capacidad:
+            yield encabezado + ''.join(items) + TOC_FIN
+            items = []
+            encabezado = TOC_CONTINUACION
 
-def layout_center_margins(row, img_url):
-    """Layout con márgenes laterales y contenido central"""
-    return f"""
-    <div class="double layout-center-margins">
-        <div class="left-margin">
-            <div class="margin-text">{row['Codigo_Tarea']}</div>
-        </div>
-        <div class="center-content">
-            <div class="image-container">
-                <img src="{img_url}" alt="Background">
-                <div class="text-overlay">
-                    <h2>{row['Nombre_Tarea_Project']}</h2>
-                    <div class="task-info">
-                        <strong>{row['Nom_Estado_Tarea_Project']}</strong> - {row['Porcentaje_Ejecucion']*100:.0f}%
-                    </div>
-                    <div class="task-info">
-                        {str(row['Notas_IA_Project'] or '')[:100]}...
-                    </div>
-                </div>
-            </div>
-        </div>
-        <div class="right-margin">
-            <div class="margin-text">PROYECTO</div>
-        </div>
-    </div>
-    """
+    # Sin tareas queda igual una página (vacía) de índice
+    if items or encabezado is TOC_INICIO:
+        yield encabezado + ''.join(items) + TOC_FIN
 
-def layout_full_overlay(row, img_url):
-    """Layout con imagen de fondo completa y overlay de texto"""
-    return f"""
-    <div class="double layout-full-overlay">
-        <div class="background-image">
-            <img src="{img_url}" alt="Background">
-        </div>
-        <div class="gradient-overlay"></div>
-        <div class="content-box">
-            <h2>
-                {row['Nombre_Tarea_Project'].split()[0]}
-                <span class="red-accent">{' '.join(row['Nombre_Tarea_Project'].split()[1:])}</span>
-            </h2>
-            <div class="task-info" style="font-size: 16px; margin-bottom: 15px;">
-                <strong>Código:</strong> {row['Codigo_Tarea']}
-            </div>
-            <div class="task-info">
-                <strong>Depósito:</strong> {row['Nombre_Deposito_Project']}
-            </div>
-            <div class="task-info">
-                <strong>Estado:</strong> {row['Nom_Estado_Tarea_Project']}
-            </div>
-            <div class="percentage-badge" style="margin-top: 20px; font-size: 18px;">
-                {row['Porcentaje_Ejecucion']*100:.0f}%
-            </div>
-        </div>
-    </div>
-    """
-
-def layout_grid(row, img_url):
-    """Layout con grid asimétrico"""
-    return f"""
-    <div class="double layout-grid">
-        <div class="text-area">
-            <h2>{row['Nombre_Tarea_Project']}</h2>
-            <div class="task-info">
-                <div class="task-label">Código</div>
-                <div class="task-value">{row['Codigo_Tarea']}</div>
-            </div>
-            <div class="task-info">
-                <div class="task-label">Notas</div>
-                <div class="task-value">{str(row['Notas_IA_Project'] or '')[:100]}..</div>
-            </div>
-            <div class="highlight-box">
-                <strong>Progreso:</strong> {row['Porcentaje_Ejecucion']*100:.0f}%<br>
-                <strong>Estado:</strong> {row['Nom_Estado_Tarea_Project']}
-            </div>
-        </div>
-        <div class="image-area-1">
-            <img src="{img_url}" alt="Background">
-        </div>
-        <div class="image-area-2">
-            <div>
-                <div class="task-label">Depósito</div>
-                <div style="font-size: 18px; font-weight: 700; margin-bottom: 10px;">
-                    {row['Nombre_Deposito_Project']}
-                </div>
-                <div class="task-label">Gerencia</div>
-                <div style="font-size: 16px;">
-                    {row['Nom_Gcia_Project']}
-                </div>
-            </div>
-        </div>
-    </div>
-    """
 
 # -------------------------
-# 6. Generar flipbook HTML
+# 3. Generar flipbook HTML
 # -------------------------
-def generar_flipbook(df, output="output/flipbook.html"):
-    estadisticas = generar_estadisticas(df)
-    paginas = []
-    
-    # Obtener todas las imágenes disponibles
-    imagenes = obtener_imagenes_aleatorias()
-    if not imagenes:
-        logger.warning("No hay imágenes disponibles. Se usará un placeholder.")
-        imagenes = ["../img/placeholder.jpg"] * len(df)
-    
-    # Definir layouts disponibles organizados por color de fondo
-    layouts_azules = [
-        layout_left_text,      # Azul
-        layout_full_overlay,   # Azul
-    ]
-    
-    layouts_oscuros = [
-        layout_right_text,     # Gris oscuro
-        layout_center_margins, # Negro
-        layout_grid,           # Negro
-    ]
-    
-    layouts_claros = [
-        layout_diagonal,       # Blanco/claro
-    ]
-    
-    # --- Portada ---
-    img_portada = "../img/Portada.jpeg"
-    portada = f"""
-    <div class="double portada-custom">
-        <div class="bg-image">
-            <img src="{img_portada}" alt="Portada">
-        </div>
-        <div class="overlay-content">
-            <h1>INFORME DE PROYECTOS</h1>
-            <div class="accent-bar"></div>
-            <div class="subtitle">Infraestructura De Datos</div>
-            <div style="margin-top: 40px; font-size: 18px; font-family: 'Montserrat', sans-serif;">
-                Total de Proyectos: <strong>{estadisticas['total_tareas']}</strong>
-            </div>
-        </div>
-    </div>
-    """
-    paginas.append(portada)
+PLANTILLA_PORTADA = cargar_plantilla("portada", ("total_tareas", "imagen"))
+PLANTILLA_ESTADISTICAS = cargar_plantilla(
+    "estadisticas",
+    ("estadisticas", "items_deposito_barras", "items_gerencia_barras", "items_estado"),
+)
+PLANTILLA_BARRA = cargar_plantilla("estadisticas_barra", ("nombre", "valor", "color", "ancho"))
+PLANTILLA_ESTADO = cargar_plantilla("estadisticas_estado", ("nombre", "valor"))
 
-    # Página 2 (izquierda)
-    paginas.append(pagina_foto())
 
-    # Página 3 (derecha)
-    paginas.append(pagina_tabla_contenido(df))
+def pagina_portada(total_tareas, imagen):
+    return PLANTILLA_PORTADA(total_tareas, imagen)
 
 
-
-    
-    
-    # --- Página de estadísticas CON GRÁFICAS DE BARRAS ---
-    
-    # Gráfica de barras para Depósitos
-    max_deposito = max(estadisticas['por_deposito'].values()) if estadisticas['por_deposito'] else 1
+def pagina_estadisticas(estadisticas):
+    # Gráfica de barras para Depósitos (ancho relativo al máximo, ya calculado)
+    por_deposito = estadisticas.por_deposito
     items_deposito_barras = ''.join([
-        f'''<div class="bar-item">
-            <div class="bar-label">
-                <span class="bar-name">{k}</span>
-                <span class="bar-value">{v}</span>
-            </div>
-            <div class="bar-track">
-                <div class="bar-fill color-1" style="width: {(v/max_deposito)*100}%"></div>
-            </div>
-        </div>'''
-        for k, v in estadisticas['por_deposito'].items()
+        PLANTILLA_BARRA(k, v, 1, por_deposito.ancho(k))
+        for k, v in por_deposito.items()
     ])
     
     # Gráfica de barras para Gerencias con colores alternos
-    max_gerencia = max(estadisticas['por_gerencia'].values()) if estadisticas['por_gerencia'] else 1
+    por_gerencia = estadisticas.por_gerencia
     items_gerencia_barras = ''.join([
-        f'''<div class="bar-item">
-            <div class="bar-label">
-                <span class="bar-name">{k}</span>
-                <span class="bar-value">{v}</span>
-            </div>
-            <div class="bar-track">
-                <div class="bar-fill color-{(i % 4) + 1}" style="width: {(v/max_gerencia)*100}%"></div>
-            </div>
-        </div>'''
-        for i, (k, v) in enumerate(estadisticas['por_gerencia'].items())
+        PLANTILLA_BARRA(k, v, (i % 4) + 1, por_gerencia.ancho(k))
+        for i, (k, v) in enumerate(por_gerencia.items())
     ])
     
     items_estado = ''.join([
-        f'<div class="state-badge"><span class="state-badge-value">{v}</span><span class="state-badge-label">{k}</span></div>'
-        for k, v in estadisticas['por_estado'].items()
+        PLANTILLA_ESTADO(k, v)
+        for k, v in estadisticas.por_estado.items()
     ])
     
-    estadistica_html = f"""
-    <div class="double stats-premium">
-        <div class="stats-container">
-            
-            <!-- Hero Section -->
-            <div class="stats-hero-section">
-                <div class="stats-kicker">Resumen Ejecutivo</div>
-                <h2>PANORAMA GENERAL</h2>
-                <div class="hero-display">
-                    <div class="hero-number">{estadisticas['total_tareas']}</div>
-                    <div class="hero-label">Tareas Registradas</div>
-                </div>
-            </div>
-            
-            <!-- Content Grid -->
-            <div class="stats-content-grid">
-                
-                <!-- Card 1: Por Depósito CON BARRAS -->
-                <div class="stat-glass-card">
-                    <div class="stat-card-title">Por Depósito</div>
-                    <div class="bar-chart">
-                        {items_deposito_barras}
-                    </div>
-                </div>
-                
-                <!-- Card 2: Por Gerencia CON BARRAS -->
-                <div class="stat-glass-card">
-                    <div class="stat-card-title">Distribución por Gerencia</div>
-                    <div class="bar-chart">
-                        {items_gerencia_barras}
-                    </div>
-                </div>
-                
-            </div>
-            
-            <!-- Card 3: Por Estado (Full Width Below) -->
-            <div class="stat-glass-card highlight" style="margin-top: 14px;">
-                <div class="stat-card-title">Distribución por Estado</div>
-                <div class="states-grid">
-                    {items_estado}
-                </div>
-            </div>
-            
-        </div>
-    </div>
-    """
-    paginas.append(estadistica_html)
-    
-    # --- Páginas de las tareas con layouts alternando colores ---
-    color_anterior = None  # Para tracking del color previo
-    
-    for idx, (_, row) in enumerate(df.iterrows()):
-        # Seleccionar imagen aleatoria
-        img_url = random.choice(imagenes)
-        
-        # Alternar entre azul/oscuro y claro/diagonal
-        # Si el anterior fue azul, siguiente debe ser oscuro o claro
-        # Si el anterior fue oscuro, siguiente puede ser azul o claro
-        
-        if color_anterior == 'azul':
-            # Siguiente debe ser oscuro o claro
-            grupo = random.choice([layouts_oscuros, layouts_claros])
-            color_anterior = 'oscuro' if grupo == layouts_oscuros else 'claro'
-        elif color_anterior == 'oscuro':
-            # Siguiente debe ser azul o claro
-            grupo = random.choice([layouts_azules, layouts_claros])
-            color_anterior = 'azul' if grupo == layouts_azules else 'claro'
-        else:  # None o 'claro'
-            # Puede ser cualquiera excepto repetir claro
-            if color_anterior == 'claro':
-                grupo = random.choice([layouts_azules, layouts_oscuros])
-                color_anterior = 'azul' if grupo == layouts_azules else 'oscuro'
-            else:
-                # Primera iteración
-                grupo = random.choice([layouts_azules, layouts_oscuros, layouts_claros])
-                if grupo == layouts_azules:
-                    color_anterior = 'azul'
-                elif grupo == layouts_oscuros:
-                    color_anterior = 'oscuro'
-                else:
-                    color_anterior = 'claro'
-        
-        layout_func = random.choice(grupo)
-        
-        # Generar página con el layout seleccionado
-        pagina = layout_func(row, img_url)
-        paginas.append(pagina)
-    
-    # --- HTML final ---
-    html = f"""
+    return PLANTILLA_ESTADISTICAS(
+        estadisticas, items_deposito_barras, items_gerencia_barras, items_estado
+    )
+
+
+HTML_INICIO = """
     <!doctype html>
     <html lang="es">
     <head>
@@ -544,12 +212,16 @@ def generar_flipbook(df, output="output/flipbook.html"):
     <link rel="stylesheet" href="../css/enhanced-flipbook.css">
     <script type="text/javascript" src="../extras/jquery.min.1.7.js"></script>
     <script type="text/javascript" src="../extras/modernizr.2.5.3.min.js"></script>
+    <!-- Con JS las imágenes aparecen sobre su placeholder (ver enhanced-flipbook.css) -->
+    <script type="text/javascript">document.documentElement.className += ' lqip';</script>
     </head>
     <body>
     <div class="flipbook-viewport">
         <div class="container">
         <div class="flipbook">
-            {''.join(paginas)}
+            """
+
+HTML_FIN = """
         </div>
 
         <!-- FLECHAS DE NAVEGACIÓN -->
@@ -565,43 +237,70 @@ def generar_flipbook(df, output="output/flipbook.html"):
     <script type="text/javascript">
         var $flipbook = $('.flipbook');
 
-        $flipbook.turn({{ 
+        // Cada imagen se muestra cuando ya está decodificada (hasta entonces
+        // se ve el placeholder del contenedor); antes de turn(), con todas
+        // las páginas en el documento
+        $flipbook.find('img').each(function () {
+            var img = this;
+            function mostrar() {
+                $(img).addClass('decodificada');
+            }
+            function decodificar() {
+                if (img.decode) {
+                    img.decode().then(mostrar, mostrar);
+                } else {
+                    mostrar();
+                }
+            }
+            if (img.complete) {
+                decodificar();
+            } else {
+                $(img).one('load error', decodificar);
+            }
+        });
+
+        $flipbook.turn({ 
             elevation: 50, 
             gradients: true, 
             autoCenter: true,
             duration: 1000,
             acceleration: true,
             display: 'double',
-            when: {{
-                turning: function(event, page, view) {{
+            when: {
+                turning: function(event, page, view) {
                     console.log('Página actual:', page);
-                }}
-            }}
-        }});
+                }
+            }
+        });
     </script>
 
     <!-- LÓGICA DE FLECHAS -->
     <script type="text/javascript">
-        document.getElementById('nextPage').addEventListener('click', function () {{
+        document.getElementById('nextPage').addEventListener('click', function () {
             $flipbook.turn('next');
-        }});
+        });
 
-        document.getElementById('prevPage').addEventListener('click', function () {{
+        document.getElementById('prevPage').addEventListener('click', function () {
             $flipbook.turn('previous');
-        }});
+        });
 
         // Navegación con teclado
-        document.addEventListener('keydown', function (e) {{
-            if (e.key === 'ArrowRight') {{
+        document.addEventListener('keydown', function (e) {
+            if (e.key === 'ArrowRight') {
                 $flipbook.turn('next');
-            }}
-            if (e.key === 'ArrowLeft') {{
+            }
+            if (e.key === 'ArrowLeft') {
                 $flipbook.turn('previous');
-            }}
-        }});
+            }
+        });
+
+        // Índice: cada entrada lleva a la página de su tarea
+        $('.toc-item[data-pagina]').on('click', function () {
+            $flipbook.turn('page', $(this).data('pagina'));
+        });
 
         // Ocultar flechas en extremos
-        $flipbook.bind('turned', function (event, page) {{
+        $flipbook.bind('turned', function (event, page) {
             var total = $flipbook.turn('pages');
 
             document.getElementById('prevPage').style.display =
@@ -609,31 +308,281 @@ def generar_flipbook(df, output="output/flipbook.html"):
 
             document.getElementById('nextPage').style.display =
                 page >= total ? 'none' : 'block';
-        }});
+        });
     </script>
 
     </body>
     </html>
     """
 
-    # Crear directorio de salida si no existe
-    os.makedirs(os.path.dirname(output), exist_ok=True)
+
+def huella_flipbook(filas, imagenes, fijas, semilla, entradas_toc, minificar):
+    """
+    Huella de un build de generar_flipbook o generar_flipbook_streaming
+    (mismo HTML con las mismas entradas): ``filas`` es el DataFrame de
+    tareas o su HuellaFilas.
+    """
+    return huella_build(
+        [filas], RECURSOS_ESTATICOS + archivos_render() + [__file__], ["img"],
+        parametros={"semilla": semilla, "entradas_toc": entradas_toc, "minificar": minificar,
+                    "imagenes": imagenes, "fijas": fijas},
+    )
+
+
+def generar_flipbook(df, output="output/flipbook.html", imagenes=None, estadisticas=None,
+                     forzar=False, comprimir=False, pool=None, semilla=0, cache=None,
+                     entradas_toc=ENTRADAS_POR_PAGINA_TOC, minificar=False):
+    """
+    Genera el flipbook de ``df`` en ``output``.
+
+    Layout e imagen de cada tarea salen de un plan reproducible (``semilla``
+    y Tarea_Project_Key) que se guarda en ``<output>.plan.json``: con los
+    mismos datos el HTML es idéntico entre ejecuciones.
+
+    Con ``pool`` (un ProcessPoolExecutor) las páginas de tareas se renderizan
+    por lotes en paralelo; el HTML es el mismo que en serie porque layouts e
+    imágenes se planean antes de renderizar. Con ``cache`` (CachePaginas)
+    solo se renderizan las páginas que cambiaron desde el build anterior.
+
+    El índice ocupa una página por cada ``entradas_toc`` tareas y cada
+    entrada lleva el número de la página de su tarea. Con ``minificar`` el
+    HTML pasa por el Minificador de flipbook_salida al escribirse.
+    """
+    # Las derivadas se preparan siempre (si faltan se regeneran) y sus URLs
+    # son parte de la huella
+    if imagenes is None:
+        imagenes = obtener_imagenes_aleatorias()
+    fijas = obtener_imagenes_fijas()
+
+    # Si datos, imágenes, CSS/JS y este script no cambiaron, el libro
+    # publicado se deja intacto (no se invalidan cachés del navegador)
+    huella = huella_flipbook(df, imagenes, fijas, semilla, entradas_toc, minificar)
+    if not forzar and build_actualizado(output, huella, comprimido=comprimir):
+        logger.info(f"⏭️  Sin cambios desde el último build, se conserva {output}")
+        return False
+
+    if estadisticas is None:
+        estadisticas = generar_estadisticas(df)
     
-    with open(output, "w", encoding="utf-8") as f:
-        f.write(html)
+    if not imagenes:
+        logger.warning("No hay imágenes disponibles. Se usará un placeholder.")
+        imagenes = ["../img/placeholder.jpg"] * len(df)
+
+    # Cada página se escribe apenas se genera (sin armar el documento en memoria)
+    with SalidaHTML(output, comprimir=comprimir, minificar=minificar) as f:
+        f.write(HTML_INICIO)
+
+        # --- Portada ---
+        f.write(pagina_portada(estadisticas.total_tareas, fijas["portada"]))
+
+        # Página 2 (izquierda)
+        f.write(pagina_foto(fijas["foto"]))
+
+        # Páginas 3 en adelante: índice. Filas como objetos Tarea (campos
+        # derivados precalculados); el DataFrame se recorre dos veces para
+        # no retener una lista de tareas
+        paginas_toc = total_paginas_toc(len(df), entradas_toc)
+        entradas = (entrada_tabla_contenido(tarea) for tarea in tareas_desde_df(df))
+        for pagina in paginas_tabla_contenido(entradas, paginas_toc + 4, entradas_toc):
+            f.write(pagina)
+
+        # --- Página de estadísticas CON GRÁFICAS DE BARRAS ---
+        f.write(pagina_estadisticas(estadisticas))
+        
+        # --- Páginas de las tareas con layouts alternando colores ---
+        # Imagen y layout de cada tarea se eligen primero, en orden
+        claves = df["Tarea_Project_Key"]
+        plan = planear_paginas(claves, imagenes, semilla)
+
+        if cache is not None:
+            cache.reiniciar_contadores()
+        for html_lote in renderizar_paginas(df, plan, pool=pool, cache=cache):
+            f.write(html_lote)
+
+        f.write(HTML_FIN)
+
+    total_paginas = len(df) + paginas_toc + 3
+    guardar_plan(output, claves, plan, semilla)
+    guardar_manifiesto(output, huella, paginas=total_paginas)
     logger.info(f"✅ Flipbook generado en {output}")
-    logger.info(f"📊 Total de páginas: {len(paginas)}")
+    logger.info(f"📊 Total de páginas: {total_paginas}")
     logger.info(f"🎨 Layouts con alternancia de colores activada")
     logger.info(f"🖼️  Estadísticas con imagen de fondo incluida")
+    if f.minificador is not None:
+        logger.info(f"🗜️  {f.minificador.resumen()}")
+    if cache is not None:
+        cache.podar()
+        logger.info(f"🗃️  {cache.resumen()}")
+    return True
+
+
+def generar_flipbook_streaming(bloques, output="output/flipbook.html", estadisticas=None,
+                               comprimir=False, semilla=0, entradas_toc=ENTRADAS_POR_PAGINA_TOC,
+                               minificar=False):
+    """
+    Variante de generar_flipbook para libros muy grandes.
+
+    Recibe un iterable de DataFrames (p. ej. obtener_tareas_por_bloques) y
+    renderiza cada fila apenas llega. Las páginas de tareas y las entradas
+    de la tabla de contenido se escriben a archivos temporales y al final
+    se copian al HTML, y el plan se escribe a medida que se planea: la
+    memoria queda acotada por el tamaño del bloque.
+
+    Si se pasan ``estadisticas`` (p. ej. de obtener_estadisticas, o un
+    Future de AccesoDatos.enviar) no se agregan los bloques en Python.
+
+    Siempre escribe el libro (los datos se conocen recién al final), pero
+    deja el mismo manifiesto que generar_flipbook: el siguiente build normal
+    con las mismas entradas no lo rehace, y con otras sí.
+    """
+    imagenes = obtener_imagenes_aleatorias()
+    fijas = obtener_imagenes_fijas()
+    huella_parametros = (imagenes, fijas, semilla, entradas_toc, minificar)
+    if not imagenes:
+        logger.warning("No hay imágenes disponibles. Se usará un placeholder.")
+        imagenes = ["../img/placeholder.jpg"]
+
+    acumulador = AcumuladorEstadisticas()
+    filas = HuellaFilas()
+    total_tareas = 0
+    ultimo_layout = None
+
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as f_toc, \
+            tempfile.TemporaryFile("w+", encoding="utf-8") as f_tareas, \
+            PlanPaginas(output, semilla) as escritor_plan:
+
+        for bloque in bloques:
+            total_tareas += len(bloque)
+            filas.agregar(bloque)
+            if estadisticas is None:
+                acumulador.agregar(bloque)
+
+            # Mismo plan que generar_flipbook, continuado de un bloque al siguiente
+            plan_bloque = planear_paginas(
+                bloque["Tarea_Project_Key"], imagenes, semilla, anterior=ultimo_layout,
+            )
+            if plan_bloque:
+                ultimo_layout = plan_bloque[-1][0]
+            escritor_plan.agregar(bloque["Tarea_Project_Key"].tolist(), plan_bloque)
+
+            for tarea, (layout_func, img_url) in zip(tareas_desde_df(bloque), plan_bloque):
+                # El número de página se conoce al final (depende del total)
+                f_toc.write(json.dumps(entrada_tabla_contenido(tarea), ensure_ascii=False) + "\n")
+                f_tareas.write(layout_func(tarea, img_url))
+
+        if hasattr(estadisticas, "result"):
+            estadisticas = estadisticas.result()
+        if estadisticas is None:
+            estadisticas = acumulador.resultado()
+
+        with SalidaHTML(output, comprimir=comprimir, minificar=minificar) as f:
+            f.write(HTML_INICIO)
+            f.write(pagina_portada(total_tareas, fijas["portada"]))
+            f.write(pagina_foto(fijas["foto"]))
+
+            f_toc.seek(0)
+            paginas_toc = total_paginas_toc(total_tareas, entradas_toc)
+            entradas = (json.loads(linea) for linea in f_toc)
+            for pagina in paginas_tabla_contenido(entradas, paginas_toc + 4, entradas_toc):
+                f.write(pagina)
+
+            f.write(pagina_estadisticas(estadisticas))
+
+            f_tareas.seek(0)
+            shutil.copyfileobj(f_tareas, f)
+            f.write(HTML_FIN)
+
+    total_paginas = total_tareas + paginas_toc + 3
+    guardar_manifiesto(output, huella_flipbook(filas, *huella_parametros), paginas=total_paginas)
+    logger.info(f"✅ Flipbook generado en {output} (streaming)")
+    logger.info(f"📊 Total de páginas: {total_paginas}")
+    if f.minificador is not None:
+        logger.info(f"🗜️  {f.minificador.resumen()}")
+
+
+def generar_flipbooks_por_jefatura(df, carpeta_salida="output", forzar=False, comprimir=False,
+                                   pool=None, semilla=0, cache=None, minificar=False):
+    """
+    Modo batch: un flipbook por jefatura a partir de un único DataFrame
+    (una sola consulta). El catálogo de imágenes se lee una vez para todos
+    y todas las ediciones comparten el mismo ``pool`` de procesos.
+    """
+    imagenes = obtener_imagenes_aleatorias()
+    salidas = []
+
+    for jefatura, df_jefatura in df.groupby("Jefatura_Project_Key", sort=True):
+        output = os.path.join(carpeta_salida, f"flipbook_jefatura_{int(jefatura)}.html")
+        generar_flipbook(df_jefatura, output=output, imagenes=imagenes, forzar=forzar,
+                         comprimir=comprimir, pool=pool, semilla=semilla, cache=cache,
+                         minificar=minificar)
+        salidas.append(output)
+
+    logger.info(f"📚 {len(salidas)} flipbooks generados en {carpeta_salida}")
+    return salidas
+
 
 # -------------------------
-# 7. Ejecutar
+# 4. Ejecutar
 # -------------------------
 if __name__ == "__main__":
     try:
-        engine = conectar_db()
-        df = obtener_tareas(engine)
-        generar_flipbook(df)
+        parser = argparse.ArgumentParser(description="Genera el flipbook de proyectos")
+        parser.add_argument("--streaming", action="store_true",
+                            help="Lee y renderiza por bloques (libros muy grandes)")
+        parser.add_argument("--chunksize", type=int, default=2000,
+                            help="Filas por bloque en modo streaming")
+        parser.add_argument("--jefaturas", type=int, nargs="+",
+                            help="Genera un flipbook por jefatura con una sola consulta")
+        parser.add_argument("--forzar", action="store_true",
+                            help="Regenera aunque datos y recursos no hayan cambiado")
+        parser.add_argument("--gzip", action="store_true",
+                            help="Escribe también flipbook.html.gz junto al HTML")
+        parser.add_argument("--procesos", type=int, default=1,
+                            help="Procesos para renderizar las páginas (0 = todos los núcleos)")
+        parser.add_argument("--semilla", type=int, default=0,
+                            help="Semilla del plan de layouts e imágenes")
+        parser.add_argument("--cache-paginas", action="store_true",
+                            help="Reutiliza las páginas que no cambiaron desde el último build "
+                                 "(solo conviene si renderizar es caro, ver flipbook_cache)")
+        parser.add_argument("--minificar", action="store_true",
+                            help="Colapsa espacios, quita comentarios y agrupa estilos repetidos")
+        args = parser.parse_args()
+        if args.streaming and args.jefaturas:
+            parser.error("--streaming y --jefaturas no se pueden combinar")
+        if args.streaming and args.procesos != 1:
+            parser.error("--streaming renderiza en un solo proceso")
+        if args.streaming and args.cache_paginas:
+            parser.error("--streaming no usa la caché de páginas")
+
+        datos = AccesoDatos()
+        pool = ProcessPoolExecutor(args.procesos or None) if args.procesos != 1 else None
+        cache = CachePaginas() if args.cache_paginas else None
+        if args.jefaturas:
+            df = obtener_tareas(datos, jefatura=args.jefaturas)
+            faltantes = set(args.jefaturas) - set(df["Jefatura_Project_Key"].unique())
+            if faltantes:
+                logger.warning(f"Jefaturas sin tareas: {sorted(faltantes)}")
+            generar_flipbooks_por_jefatura(df, forzar=args.forzar, comprimir=args.gzip, pool=pool,
+                                           semilla=args.semilla, cache=cache,
+                                           minificar=args.minificar)
+        elif args.streaming:
+            # Los conteos se calculan en la BD mientras se leen los bloques
+            generar_flipbook_streaming(
+                obtener_tareas_por_bloques(datos, chunksize=args.chunksize),
+                estadisticas=datos.enviar(obtener_estadisticas),
+                comprimir=args.gzip,
+                semilla=args.semilla,
+                minificar=args.minificar,
+            )
+        else:
+            df = obtener_tareas(datos)
+            generar_flipbook(df, forzar=args.forzar, comprimir=args.gzip, pool=pool,
+                             semilla=args.semilla, cache=cache, minificar=args.minificar)
+        if pool is not None:
+            pool.shutdown()
+        if cache is not None:
+            cache.cerrar()
+        datos.cerrar()
     except Exception as e:
         logger.error(f"❌ Error: {e}")
         raise
\ No newline at end of file
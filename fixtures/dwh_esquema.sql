@@ -0,0 +1,73 @@
+-- Esquema local (SQLite) que replica las tablas del DWH usadas por el flipbook.
+-- Las tablas [DWH_INCOLMOTOS].[esquema].[Tabla] se nombran esquema_Tabla.
+
+CREATE TABLE ti_Dim_Depositos_Project (
+    Deposito_Project_Key    INTEGER PRIMARY KEY,
+    Nombre_Deposito_Project TEXT
+);
+
+CREATE TABLE ti_Dim_Gcias_Involucradas_Project (
+    Gcia_Project_Key INTEGER PRIMARY KEY,
+    Nom_Gcia_Project TEXT
+);
+
+CREATE TABLE ti_Dim_Estado_Tareas_Project (
+    Estado_Tarea_Project_key INTEGER PRIMARY KEY,
+    Nom_Estado_Tarea_Project TEXT
+);
+
+CREATE TABLE ti_Dim_Tareas_Project (
+    Tarea_Project_Key            INTEGER PRIMARY KEY,
+    Project_Project_Key          INTEGER,
+    Jefatura_Project_Key         INTEGER,
+    Codigo_Esquema_Tarea         TEXT,
+    Codigo_Tarea                 TEXT,
+    Nombre_Tarea_Project         TEXT,
+    Descripcion_Tarea_Project    TEXT,
+    Estado_Tarea_Project_key     INTEGER,
+    Objs_Estrat_Area_Project_Key INTEGER,
+    Objs_Div_TI_Project_Key      INTEGER,
+    Gcia_Project_Key             INTEGER,
+    Categoria_YMC_key            INTEGER,
+    Codigo_MTP_key               INTEGER,
+    Porcentaje_Ejecucion         REAL,
+    Deposito_Project_Key         INTEGER,
+    Fecha_Inicio                 TEXT,
+    Fecha_Fin                    TEXT,
+    Fecha_Estimada_Entrega       TEXT,
+    Notas_IA_Project             TEXT,
+    -- Columna de cambios para probar FLIPBOOK_WATERMARK
+    Fecha_Modificacion           TEXT
+);
+
+CREATE TABLE admn_Fact_Encuesta_Proyectos (
+    Encuesta_Key           INTEGER PRIMARY KEY,
+    Project_Project_Key    INTEGER,
+    Calidad_Entrega        INTEGER,
+    Tiempo_Entrega         INTEGER,
+    "Acompañamiento_Entrega" INTEGER,
+    Experiencia_Entrega    INTEGER
+);
+
+INSERT INTO ti_Dim_Depositos_Project VALUES
+    (1, 'Backlog'),
+    (2, 'Finalizado'),
+    (3, 'En Curso'),
+    (4, 'En Pausa'),
+    (5, 'Cancelado');
+
+INSERT INTO ti_Dim_Estado_Tareas_Project VALUES
+    (1, 'Planeado'),
+    (2, 'Replanteado'),
+    (3, 'Nuevo'),
+    (4, 'Plan Anterior');
+
+INSERT INTO ti_Dim_Gcias_Involucradas_Project VALUES
+    (1, 'Gerencia Comercial'),
+    (2, 'Gerencia Financiera'),
+    (3, 'Gerencia de Postventa'),
+    (4, 'Gerencia de Logística'),
+    (5, 'Gerencia de Talento Humano'),
+    (6, 'Gerencia de Mercadeo'),
+    (7, 'Gerencia de Tecnología'),
+    (8, 'Gerencia de Planta');
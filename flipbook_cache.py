@@ -0,0 +1,196 @@
+import hashlib
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import flipbook_layouts
+from flipbook_salida import archivos_codigo
+
+# -------------------------
+# 1. Configuración
+# -------------------------
+CACHE_PAGINAS = os.environ.get("FLIPBOOK_CACHE_PAGINAS", ".cache/paginas.sqlite")
+CACHE_PAGINAS_MB = int(os.environ.get("FLIPBOOK_CACHE_PAGINAS_MB", 256))
+
+# Código que arma cada página a partir de la fila: la clase Tarea y sus
+# campos derivados, y lo que usan de los demás módulos (texto, fecha_texto,
+# imagen_pagina...); si cualquier flipbook_*.py cambia, ninguna página
+# guardada sirve
+_huella = hashlib.sha256()
+for _archivo in archivos_codigo():
+    _huella.update(Path(_archivo).read_bytes())
+HUELLA_CODIGO = _huella.hexdigest()[:16]
+
+
+def prefijo_pagina(layout_func, img_url):
+    """
+    Parte de la clave común a las páginas de un layout con una imagen: el
+    layout y la versión de su plantilla, la imagen y el código de Tarea.
+    """
+    contenido = repr((
+        HUELLA_CODIGO, layout_func.__name__, getattr(layout_func, "huella", None), img_url,
+    ))
+    return hashlib.blake2b(contenido.encode("utf-8"), digest_size=16).digest()
+
+
+def huellas_filas(df):
+    """
+    Hash de 64 bits de los valores que usa cada página (CAMPOS_TAREA) por
+    fila de ``df``, en una sola pasada vectorizada (sin repr por fila).
+    """
+    columnas = df[list(flipbook_layouts.CAMPOS_TAREA)]
+    return pd.util.hash_pandas_object(columnas, index=False).to_numpy().tolist()
+
+
+def clave_pagina(huella_fila, layout_func, img_url, prefijo=None):
+    """
+    Clave de una página: la huella de su fila (de huellas_filas) y
+    ``prefijo`` (de prefijo_pagina, que se calcula si no se pasa). Cambiar
+    una plantilla invalida solo las páginas hechas con ella.
+    """
+    if prefijo is None:
+        prefijo = prefijo_pagina(layout_func, img_url)
+    contenido = prefijo + huella_fila.to_bytes(8, "little")
+    return hashlib.blake2b(contenido, digest_size=16).hexdigest()
+
+
+# -------------------------
+# 2. Caché en disco
+# -------------------------
+class CachePaginas:
+    """
+    Páginas de tareas ya renderizadas, en un SQLite local, para reconstruir
+    solo las que cambiaron entre un build y el siguiente.
+
+    Es opcional (--cache-paginas) y está apagada por defecto: las
+    plantillas compiladas renderizan decenas de miles de páginas por
+    segundo en un proceso, y leer el HTML guardado cuesta lo mismo (20000
+    tareas: 0,85 s sin caché, 0,93 s con la caché caliente). Solo ahorra
+    cuando renderizar es más caro que leer, p. ej. con el pool de procesos
+    (1,29 s → 0,97 s) o plantillas más pesadas.
+
+    Se limita a ``max_mb``: al podar se descartan primero las páginas usadas
+    hace más tiempo (LRU). Los contadores (aciertos, fallos, bytes) se
+    reinician con reiniciar_contadores y se resumen con resumen().
+    """
+
+    def __init__(self, ruta=CACHE_PAGINAS, max_mb=CACHE_PAGINAS_MB):
+        self.ruta = Path(ruta)
+        self.max_bytes = max_mb * 1024 * 1024
+        # Prefijo de cada (layout, imagen) del plan: la imagen (con su
+        # placeholder en data URI) se serializa una vez, no en cada página.
+        # Guarda la ImagenPagina para que su id no se reutilice
+        self._prefijos = {}
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.ruta, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Sin fsync por commit: con WAL un corte de luz pierde a lo sumo los
+        # últimos lotes (se vuelven a renderizar), nunca corrompe la base
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS paginas (
+                clave TEXT PRIMARY KEY,
+                html TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                ultimo_uso REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_ultimo_uso ON paginas (ultimo_uso)")
+        self.reiniciar_contadores()
+
+    def reiniciar_contadores(self):
+        self.aciertos = 0
+        self.fallos = 0
+        self.bytes_reutilizados = 0
+        self.bytes_nuevos = 0
+        self.descartadas = 0
+
+    @staticmethod
+    def huellas_filas(df):
+        # Para renderizar_paginas: flipbook_layouts no importa este módulo
+        return huellas_filas(df)
+
+    def _prefijo(self, layout_func, img_url):
+        clave = (layout_func, id(img_url))
+        guardado = self._prefijos.get(clave)
+        if guardado is None:
+            guardado = self._prefijos[clave] = (img_url, prefijo_pagina(layout_func, img_url))
+        return guardado[1]
+
+    def claves(self, lote, huellas):
+        """Clave de cada página de un lote (valores, layout_func, img_url) y sus ``huellas``"""
+        return [
+            clave_pagina(huella, layout_func, img_url, self._prefijo(layout_func, img_url))
+            for huella, (_, layout_func, img_url) in zip(huellas, lote)
+        ]
+
+    def buscar(self, claves):
+        """HTML de cada clave, o None si no está en caché (en el mismo orden)"""
+        marcas = ",".join("?" * len(claves))
+        encontradas, reutilizados = {}, 0
+        for clave, html, bytes_ in self._conn.execute(
+            f"SELECT clave, html, bytes FROM paginas WHERE clave IN ({marcas})", claves
+        ):
+            encontradas[clave] = html
+            reutilizados += bytes_
+        if encontradas:
+            with self._conn:
+                self._conn.execute(
+                    f"UPDATE paginas SET ultimo_uso = ? WHERE clave IN ({marcas})",
+                    [time.time(), *claves],
+                )
+
+        paginas = [encontradas.get(clave) for clave in claves]
+        self.aciertos += len(encontradas)
+        self.fallos += len(claves) - len(encontradas)
+        self.bytes_reutilizados += reutilizados
+        return paginas
+
+    def guardar(self, claves, paginas):
+        ahora = time.time()
+        filas = [
+            (clave, html, len(html.encode("utf-8")), ahora)
+            for clave, html in zip(claves, paginas)
+        ]
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO paginas VALUES (?, ?, ?, ?)", filas)
+        self.bytes_nuevos += sum(fila[2] for fila in filas)
+
+    def tamano(self):
+        return self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM paginas").fetchone()[0]
+
+    def podar(self):
+        """Descarta las páginas menos usadas hasta quedar dentro de max_bytes"""
+        exceso = self.tamano() - self.max_bytes
+        if exceso <= 0:
+            return 0
+
+        descartar, liberados = [], 0
+        for clave, bytes_ in self._conn.execute(
+            "SELECT clave, bytes FROM paginas ORDER BY ultimo_uso"
+        ):
+            if liberados >= exceso:
+                break
+            descartar.append((clave,))
+            liberados += bytes_
+        with self._conn:
+            self._conn.executemany("DELETE FROM paginas WHERE clave = ?", descartar)
+
+        self.descartadas += len(descartar)
+        return len(descartar)
+
+    def resumen(self):
+        total = self.aciertos + self.fallos
+        tasa = self.aciertos / total * 100 if total else 0
+        return (
+            f"Caché de páginas: {self.aciertos} aciertos, {self.fallos} fallos ({tasa:.0f}%), "
+            f"{self.bytes_reutilizados / 1024:,.0f} KB reutilizados, "
+            f"{self.bytes_nuevos / 1024:,.0f} KB nuevos, {self.descartadas} descartadas, "
+            f"{self.tamano() / 1024 / 1024:,.1f} MB en disco"
+        )
+
+    def cerrar(self):
+        self._conn.close()
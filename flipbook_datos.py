@@ -0,0 +1,580 @@
+import pandas as pd
+from sqlalchemy import text, bindparam
+from sqlalchemy.exc import DBAPIError
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from flipbook_fuentes import fuente_por_defecto
+from flipbook_estadisticas import AcumuladorEstadisticas, agregar_grano, resumir_grano
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow.parquet  # motor de Parquet para los snapshots
+    HAY_PARQUET = True
+except ImportError:
+    HAY_PARQUET = False
+
+# Snapshots locales de las consultas (configurables por variables de entorno)
+SNAPSHOT_DIR = os.environ.get("FLIPBOOK_SNAPSHOT_DIR", ".cache/snapshots")
+SNAPSHOT_TTL = int(os.environ.get("FLIPBOOK_SNAPSHOT_TTL", 3600))  # segundos
+MODO_OFFLINE = os.environ.get("FLIPBOOK_OFFLINE", "0") == "1"
+
+# Extracción incremental de tareas: columna de Dim_Tareas_Project que cambia
+# con cada modificación (rowversion o fecha de actualización). Sin ella se
+# hace siempre la extracción completa.
+COLUMNA_WATERMARK = os.environ.get("FLIPBOOK_WATERMARK")
+REFRESCO_COMPLETO = int(os.environ.get("FLIPBOOK_REFRESCO_COMPLETO", 86400))  # segundos
+
+# -------------------------
+# 0. Esquema de tipos
+# -------------------------
+# Tipos aplicados al cargar las tareas: categorías para los nombres de
+# dimensiones, enteros pequeños con nulos para las claves, fechas reales
+# y texto respaldado por Arrow para las notas.
+ESQUEMA_TAREAS = {
+    "Tarea_Project_Key": "Int32",
+    "Project_Project_Key": "Int32",
+    "Jefatura_Project_Key": "Int16",
+    "Estado_Tarea_Project_key": "Int16",
+    "Objs_Estrat_Area_Project_Key": "Int16",
+    "Objs_Div_TI_Project_Key": "Int16",
+    "Gcia_Project_Key": "Int16",
+    "Categoria_YMC_key": "Int16",
+    "Codigo_MTP_key": "Int16",
+    "Deposito_Project_Key": "Int16",
+    "Fecha_Inicio": "datetime64[ns]",
+    "Fecha_Fin": "datetime64[ns]",
+    "Fecha_Estimada_Entrega": "datetime64[ns]",
+    "Nombre_Deposito_Project": "category",
+    "Nom_Gcia_Project": "category",
+    "Nom_Estado_Tarea_Project": "category",
+    "Notas_IA_Project": "string[pyarrow]" if HAY_PARQUET else "string",
+}
+
+
+def aplicar_esquema(df, esquema, reportar=False):
+    """
+    Convierte las columnas de ``df`` a los tipos de ``esquema``.
+    Las columnas que no están en el DataFrame se ignoran.
+    """
+    if not esquema:
+        return df
+
+    antes = df
+    tipos = {}
+    for columna, tipo in esquema.items():
+        if columna not in df.columns or df[columna].dtype == tipo:
+            continue
+        if tipo.startswith("datetime64"):
+            if not pd.api.types.is_datetime64_any_dtype(df[columna]):
+                df = df.assign(**{columna: pd.to_datetime(df[columna], errors="coerce")})
+        else:
+            tipos[columna] = tipo
+    if tipos:
+        df = df.astype(tipos)
+
+    if reportar and df is not antes:
+        logger.info("🧮 Memoria por columna:\n" + reporte_memoria(antes, df).to_string())
+    return df
+
+
+def reporte_memoria(antes, despues=None):
+    """
+    Memoria (KB, deep) y tipo de cada columna. Si se pasa ``despues`` se
+    comparan las dos versiones del DataFrame, con una fila de total.
+    """
+    def kb(df):
+        return df.memory_usage(deep=True, index=False) / 1024
+
+    reporte = pd.DataFrame({"Tipo": antes.dtypes.astype(str), "KB": kb(antes)})
+    if despues is not None:
+        reporte = pd.DataFrame({
+            "Tipo_Antes": antes.dtypes.astype(str),
+            "KB_Antes": kb(antes),
+            "Tipo_Despues": despues.dtypes.astype(str),
+            "KB_Despues": kb(despues),
+        })
+        reporte.loc["TOTAL"] = ["", reporte["KB_Antes"].sum(), "", reporte["KB_Despues"].sum()]
+    return reporte.round(1)
+
+
+def texto(valor):
+    """Texto de una celda; '' si es nulo (None, NaN o pd.NA)"""
+    return "" if pd.isna(valor) else str(valor)
+
+
+def fecha_texto(valor):
+    """Fecha de una celda como 2026-01-30 (sin hora); '' si es nula (NaT)"""
+    return "" if pd.isna(valor) else pd.Timestamp(valor).strftime("%Y-%m-%d")
+
+
+# -------------------------
+# 1. Conectar a la BD (fuentes en flipbook_fuentes.py)
+# -------------------------
+class AccesoDatos:
+    """
+    Capa de acceso a datos de un build.
+
+    Usa un único engine con pool (el de ``fuente``, por defecto el DWH en
+    SQL Server o lo que indique FLIPBOOK_FUENTE) y ejecuta cada consulta
+    una sola vez:
+    si dos consumidores piden la misma consulta con los mismos parámetros
+    reciben el mismo DataFrame en memoria.
+
+    Cada resultado se guarda además como snapshot Parquet (zstd) en
+    ``snapshot_dir``. Dentro de ``ttl`` segundos se lee el snapshot sin
+    tocar SQL Server; en modo ``offline``, o si la BD no responde, se usa
+    el último snapshot disponible aunque esté vencido.
+
+    Las consultas independientes se pueden lanzar en paralelo con
+    ``enviar``; cada hilo toma su propia conexión del pool y una consulta
+    en curso bloquea solo a quien pida exactamente la misma.
+    """
+
+    def __init__(self, fuente=None, snapshot_dir=SNAPSHOT_DIR,
+                 ttl=SNAPSHOT_TTL, offline=MODO_OFFLINE,
+                 refresco_completo=REFRESCO_COMPLETO, max_hilos=4):
+        self.fuente = fuente if fuente is not None else fuente_por_defecto()
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else None
+        self.ttl = ttl
+        self.offline = offline
+        self.refresco_completo = refresco_completo
+        self.max_hilos = max_hilos
+        self._resultados = {}
+        self._candados = {}
+        self._candados_lock = threading.Lock()
+        self._executor = None
+
+        if self.snapshot_dir and not HAY_PARQUET:
+            logger.warning("pyarrow no está instalado: snapshots desactivados")
+            self.snapshot_dir = None
+
+    @property
+    def engine(self):
+        # El engine se crea solo si de verdad hay que ir a la BD
+        return self.fuente.engine
+
+    def enviar(self, funcion, *args, **kwargs):
+        """
+        Ejecuta ``funcion(self, *args, **kwargs)`` en el pool de hilos y
+        devuelve un Future. Ej.: ``datos.enviar(Promedio_Encuestas)``.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_hilos, thread_name_prefix="consulta"
+            )
+        return self._executor.submit(funcion, self, *args, **kwargs)
+
+    def cerrar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _candado(self, clave):
+        with self._candados_lock:
+            return self._candados.setdefault(clave, threading.Lock())
+
+    @staticmethod
+    def _clave(query, params):
+        params = params or {}
+        return (
+            " ".join(query.split()),
+            tuple(sorted(
+                (k, tuple(v) if isinstance(v, (list, tuple)) else v)
+                for k, v in params.items()
+            )),
+        )
+
+    def _ruta_snapshot(self, clave):
+        digest = hashlib.sha256(
+            repr((self.fuente.nombre, clave)).encode("utf-8")
+        ).hexdigest()[:24]
+        return self.snapshot_dir / f"{digest}.parquet"
+
+    def _leer_snapshot(self, ruta, vigente=True):
+        if ruta is None or not ruta.exists():
+            return None
+        edad = time.time() - ruta.stat().st_mtime
+        if vigente and edad > self.ttl:
+            return None
+        logger.info(f"📦 Snapshot {ruta.name} ({edad:.0f}s de antigüedad)")
+        return pd.read_parquet(ruta)
+
+    def _guardar_snapshot(self, ruta, df):
+        if ruta is None:
+            return
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        tmp = ruta.with_suffix(".tmp")
+        df.to_parquet(tmp, compression="zstd", index=False)
+        os.replace(tmp, ruta)
+
+    def _sql(self, query, params):
+        sql = text(self.fuente.adaptar_sql(query))
+        expandibles = [
+            bindparam(k, expanding=True)
+            for k, v in (params or {}).items()
+            if isinstance(v, (list, tuple))
+        ]
+        if expandibles:
+            sql = sql.bindparams(*expandibles)
+        return sql
+
+    def _ejecutar(self, query, params):
+        with self.engine.connect() as conn:
+            return pd.read_sql(self._sql(query, params), conn, params=params)
+
+    def consultar(self, query, params=None, esquema=None):
+        clave = self._clave(query, params)
+        with self._candado(clave):
+            return self._consultar(clave, query, params, esquema)
+
+    def _consultar(self, clave, query, params, esquema):
+        if clave in self._resultados:
+            logger.debug("Consulta reutilizada desde memoria")
+            return self._resultados[clave]
+
+        ruta = self._ruta_snapshot(clave) if self.snapshot_dir else None
+
+        df = self._leer_snapshot(ruta, vigente=not self.offline)
+        if df is None:
+            if self.offline:
+                raise RuntimeError(
+                    "Modo offline sin snapshot para la consulta solicitada"
+                )
+            try:
+                df = self._ejecutar(query, params)
+            except DBAPIError as e:
+                df = self._leer_snapshot(ruta, vigente=False)
+                if df is None:
+                    raise
+                logger.warning(f"⚠️ BD no disponible, se usa snapshot vencido: {e}")
+            else:
+                df = aplicar_esquema(df, esquema, reportar=True)
+                self._guardar_snapshot(ruta, df)
+
+        # Snapshots viejos pueden no tener los tipos del esquema
+        df = aplicar_esquema(df, esquema)
+        self._resultados[clave] = df
+        return df
+
+    def disponible_local(self, query, params=None):
+        """
+        Indica si la consulta se resolvería sin ir a la BD (memoria o snapshot)
+        """
+        clave = self._clave(query, params)
+        if clave in self._resultados:
+            return True
+        if self.snapshot_dir is None:
+            return False
+        ruta = self._ruta_snapshot(clave)
+        if not ruta.exists():
+            return False
+        return self.offline or time.time() - ruta.stat().st_mtime <= self.ttl
+
+    def consultar_por_bloques(self, query, params=None, chunksize=2000, esquema=None):
+        """
+        Devuelve la consulta como un generador de DataFrames de ``chunksize``
+        filas, para no tener nunca el resultado completo en memoria.
+
+        Si el resultado ya está en memoria o hay un snapshot vigente se
+        recorre por bloques; si no, pd.read_sql va pidiendo a la BD
+        ``chunksize`` filas por vez (fetchmany), así en Python solo hay un
+        bloque a la vez; lo que adelante el driver por su cuenta depende de
+        él. La lectura por bloques no escribe snapshots.
+        """
+        clave = self._clave(query, params)
+        if clave in self._resultados:
+            df = self._resultados[clave]
+            for inicio in range(0, len(df), chunksize):
+                yield df.iloc[inicio:inicio + chunksize]
+            return
+
+        ruta = self._ruta_snapshot(clave) if self.snapshot_dir else None
+        if ruta is not None and ruta.exists():
+            edad = time.time() - ruta.stat().st_mtime
+            if self.offline or edad <= self.ttl:
+                archivo = pyarrow.parquet.ParquetFile(ruta)
+                for lote in archivo.iter_batches(batch_size=chunksize):
+                    yield aplicar_esquema(lote.to_pandas(), esquema)
+                return
+
+        if self.offline:
+            raise RuntimeError("Modo offline sin snapshot para la consulta solicitada")
+
+        with self.engine.connect() as conn:
+            for bloque in pd.read_sql(
+                self._sql(query, params), conn, params=params, chunksize=chunksize
+            ):
+                yield aplicar_esquema(bloque, esquema)
+
+    def consultar_incremental(self, query, params, query_cambios, query_claves,
+                              clave_fila, columna_watermark="_Watermark", esquema=None):
+        """
+        Como ``consultar``, pero el snapshot se actualiza de forma incremental.
+
+        ``query`` trae todas las filas (con la columna ``columna_watermark``),
+        ``query_cambios`` las filas con watermark mayor a ``:watermark`` sin
+        filtrar por alcance, y ``query_claves`` las claves que hoy cumplen
+        los filtros. Las filas cambiadas reemplazan a las del snapshot y
+        luego se descartan las claves que ya no están vigentes (borradas,
+        excluidas o movidas a otra jefatura). Cada ``refresco_completo``
+        segundos se vuelve a extraer todo para recoger cambios en las
+        dimensiones.
+        """
+        clave = self._clave(query, params)
+        with self._candado(clave):
+            if clave in self._resultados:
+                return self._resultados[clave]
+            df = self._consultar_incremental(
+                clave, query, params, query_cambios, query_claves,
+                clave_fila, columna_watermark,
+            )
+            df = df.drop(columns=[columna_watermark], errors="ignore")
+            df = aplicar_esquema(df, esquema)
+            self._resultados[clave] = df
+            return df
+
+    def _consultar_incremental(self, clave, query, params, query_cambios,
+                               query_claves, clave_fila, columna_watermark):
+        if self.snapshot_dir is None:
+            df = self._ejecutar(query, params)
+        else:
+            ruta = self._ruta_snapshot(clave)
+            df = self._leer_snapshot(ruta, vigente=not self.offline)
+            if df is None:
+                if self.offline:
+                    raise RuntimeError(
+                        "Modo offline sin snapshot para la consulta solicitada"
+                    )
+                base = self._leer_snapshot(ruta, vigente=False)
+                try:
+                    df = self._actualizar_incremental(
+                        ruta, base, query, params, query_cambios,
+                        query_claves, clave_fila, columna_watermark,
+                    )
+                except DBAPIError as e:
+                    if base is None:
+                        raise
+                    logger.warning(f"⚠️ BD no disponible, se usa snapshot vencido: {e}")
+                    df = base
+        return df
+
+    def _actualizar_incremental(self, ruta, base, query, params, query_cambios,
+                                query_claves, clave_fila, columna_watermark):
+        ruta_meta = ruta.with_suffix(".json")
+        meta = json.loads(ruta_meta.read_text()) if ruta_meta.exists() else {}
+        completo = (
+            base is None
+            or base.empty
+            or time.time() - meta.get("extraccion_completa", 0) > self.refresco_completo
+        )
+
+        df = None
+        if not completo:
+            watermark = base[columna_watermark].max()
+            # El driver no acepta escalares de numpy/pandas
+            if isinstance(watermark, pd.Timestamp):
+                watermark = watermark.to_pydatetime()
+            elif hasattr(watermark, "item"):
+                watermark = watermark.item()
+            cambios = self._ejecutar(query_cambios, {"watermark": watermark})
+            vigentes = self._ejecutar(query_claves, params)[clave_fila]
+
+            if cambios.empty:
+                df = base
+            else:
+                df = pd.concat(
+                    [base[~base[clave_fila].isin(cambios[clave_fila])], cambios],
+                    ignore_index=True,
+                )
+            df = df[df[clave_fila].isin(vigentes)]
+
+            if len(df) != vigentes.nunique():
+                # Hay claves vigentes que nunca pasaron por el watermark
+                logger.warning("Snapshot incremental incompleto, se extrae todo")
+                df = None
+            else:
+                logger.info(
+                    f"🔄 Extracción incremental: {len(cambios)} filas cambiadas, "
+                    f"{len(df)} vigentes"
+                )
+
+        if df is None:
+            df = self._ejecutar(query, params)
+            meta = {"extraccion_completa": time.time()}
+            logger.info(f"🔄 Extracción completa: {len(df)} filas")
+
+        df = df.sort_values(clave_fila).reset_index(drop=True)
+        self._guardar_snapshot(ruta, df)
+        ruta_meta.write_text(json.dumps(meta))
+        return df
+
+
+# -------------------------
+# 2. Obtener los datos
+# -------------------------
+COLUMNAS_TAREAS = """
+        T.Tarea_Project_Key,
+        T.Project_Project_Key,
+        T.Jefatura_Project_Key,
+        T.Codigo_Esquema_Tarea,
+        T.Codigo_Tarea,
+        T.Nombre_Tarea_Project,
+        T.Descripcion_Tarea_Project,
+        T.Estado_Tarea_Project_key,
+        T.Objs_Estrat_Area_Project_Key,
+        T.Objs_Div_TI_Project_Key,
+        T.Gcia_Project_Key,
+        T.Categoria_YMC_key,
+        T.Codigo_MTP_key,
+        T.Porcentaje_Ejecucion,
+        T.Deposito_Project_Key,
+        T.Fecha_Inicio,
+        T.Fecha_Fin,
+        T.Fecha_Estimada_Entrega,
+        T.Notas_IA_Project,
+        D.Nombre_Deposito_Project,
+        G.Nom_Gcia_Project,
+        E.Nom_Estado_Tarea_Project
+"""
+
+FROM_TAREAS = """
+    FROM [DWH_INCOLMOTOS].[ti].[Dim_Tareas_Project] T
+    LEFT JOIN [DWH_INCOLMOTOS].[ti].[Dim_Depositos_Project] D
+        ON T.Deposito_Project_Key = D.Deposito_Project_Key
+    LEFT JOIN [DWH_INCOLMOTOS].[ti].[Dim_Gcias_Involucradas_Project] G
+        ON T.Gcia_Project_Key = G.Gcia_Project_Key
+    LEFT JOIN [DWH_INCOLMOTOS].[ti].[Dim_Estado_Tareas_Project] E
+        ON T.Estado_Tarea_Project_key = E.Estado_Tarea_Project_key
+"""
+
+SELECT_TAREAS = "    SELECT" + COLUMNAS_TAREAS + FROM_TAREAS
+
+QUERY_PROMEDIO_ENCUESTAS = """
+    SELECT
+        COUNT(*) AS Total_Encuestas,
+        ROUND(AVG(Calidad_Entrega),2)        AS Promedio_Calidad,
+        ROUND(AVG(Tiempo_Entrega),2)         AS Promedio_Tiempo,
+        ROUND(AVG(Acompañamiento_Entrega),2) AS Promedio_Acompanamiento,
+        ROUND(AVG(Experiencia_Entrega),2)    AS Promedio_Experiencia
+    FROM [DWH_INCOLMOTOS].[admn].[Fact_Encuesta_Proyectos];
+"""
+
+
+def _filtro_alcance(params, jefatura, excluir):
+    """
+    WHERE de las consultas de tareas. ``jefatura`` puede ser una clave o
+    una lista de claves (modo batch, una sola consulta para varios libros).
+    """
+    if isinstance(jefatura, (list, tuple)):
+        params["jefaturas"] = tuple(jefatura)
+        filtro = "    WHERE T.Jefatura_Project_Key IN :jefaturas\n"
+    else:
+        params["jefatura"] = jefatura
+        filtro = "    WHERE T.Jefatura_Project_Key = :jefatura\n"
+
+    if excluir:
+        params["excluir"] = tuple(excluir)
+        filtro += "    AND T.Tarea_Project_Key NOT IN :excluir\n"
+    return filtro
+
+
+def obtener_tareas(datos, jefatura=2, excluir=(), watermark=COLUMNA_WATERMARK):
+    params = {}
+    filtro = _filtro_alcance(params, jefatura, excluir)
+
+    if not watermark:
+        return datos.consultar(SELECT_TAREAS + filtro, params, esquema=ESQUEMA_TAREAS)
+
+    # Extracción incremental: el watermark viaja como columna extra y los
+    # cambios se piden sin filtro de alcance para detectar salidas
+    columnas = COLUMNAS_TAREAS.rstrip() + f",\n        T.[{watermark}] AS _Watermark\n"
+    query_completa = "    SELECT" + columnas + FROM_TAREAS + filtro
+    query_cambios = (
+        "    SELECT" + columnas + FROM_TAREAS
+        + f"    WHERE T.[{watermark}] > :watermark\n"
+    )
+    query_claves = (
+        "    SELECT T.Tarea_Project_Key\n"
+        "    FROM [DWH_INCOLMOTOS].[ti].[Dim_Tareas_Project] T\n" + filtro
+    )
+    return datos.consultar_incremental(
+        query_completa, params, query_cambios, query_claves,
+        clave_fila="Tarea_Project_Key", esquema=ESQUEMA_TAREAS,
+    )
+
+
+def obtener_tareas_por_bloques(datos, jefatura=2, excluir=(), chunksize=2000):
+    params = {}
+    query = SELECT_TAREAS + _filtro_alcance(params, jefatura, excluir)
+    return datos.consultar_por_bloques(
+        query, params, chunksize=chunksize, esquema=ESQUEMA_TAREAS
+    )
+
+
+def Promedio_Encuestas(datos):
+    return datos.consultar(QUERY_PROMEDIO_ENCUESTAS)
+
+
+# -------------------------
+# 3. Calcular estadísticas (motor en flipbook_estadisticas.py)
+# -------------------------
+# Un GROUP BY al mismo grano que agregar_grano: la BD devuelve la tabla
+# pequeña de la que resumir_grano deriva todas las cifras del libro
+QUERY_ESTADISTICAS = """
+    SELECT
+        D.Nombre_Deposito_Project,
+        G.Nom_Gcia_Project,
+        E.Nom_Estado_Tarea_Project,
+        T.Estado_Tarea_Project_key,
+        T.Deposito_Project_Key,
+        COUNT(*) AS Tareas,
+        SUM(T.Porcentaje_Ejecucion) AS Suma_Ejecucion,
+        COUNT(T.Porcentaje_Ejecucion) AS Con_Ejecucion""" + FROM_TAREAS
+
+GROUP_BY_ESTADISTICAS = """    GROUP BY
+        D.Nombre_Deposito_Project,
+        G.Nom_Gcia_Project,
+        E.Nom_Estado_Tarea_Project,
+        T.Estado_Tarea_Project_key,
+        T.Deposito_Project_Key
+"""
+
+
+def generar_estadisticas(df):
+    """Estadisticas de ``df`` con una sola agrupación de sus filas"""
+    return resumir_grano(agregar_grano(df))
+
+
+def obtener_estadisticas(datos, jefatura=2, excluir=(), chunksize=50000):
+    """
+    Estadísticas del libro calculadas en la BD con un solo GROUP BY, sin
+    traer las filas de tareas por ODBC.
+
+    Si las tareas ya están en memoria o en un snapshot utilizable se
+    calculan con pandas para no ir a la BD y para que coincidan con las
+    páginas generadas a partir de esos datos: por bloques de ``chunksize``
+    filas (AcumuladorEstadisticas), así un snapshot no se carga entero ni
+    queda en memoria (p. ej. en el modo streaming). Devuelve el mismo
+    resultado que generar_estadisticas.
+    """
+    params = {}
+    filtro = _filtro_alcance(params, jefatura, excluir)
+
+    query_tareas = SELECT_TAREAS + filtro
+    if datos.disponible_local(query_tareas, params):
+        acumulador = AcumuladorEstadisticas()
+        for bloque in datos.consultar_por_bloques(
+            query_tareas, params, chunksize=chunksize, esquema=ESQUEMA_TAREAS
+        ):
+            acumulador.agregar(bloque)
+        return acumulador.resultado()
+
+    grano = datos.consultar(QUERY_ESTADISTICAS + filtro + GROUP_BY_ESTADISTICAS, params)
+    return resumir_grano(grano)
@@ -0,0 +1,273 @@
+import numpy as np
+import pandas as pd
+
+# -------------------------
+# 1. Criterios
+# -------------------------
+# Dimensiones de la página de estadísticas: atributo del resultado → columna
+COLUMNAS_ESTADISTICAS = {
+    "por_deposito": "Nombre_Deposito_Project",
+    "por_gerencia": "Nom_Gcia_Project",
+    "por_estado": "Nom_Estado_Tarea_Project",
+}
+
+# Claves con las que se clasifican las tareas en los indicadores del plan
+# (las mismas que agrupan las listas de contenido_por_estado)
+ESTADO_NUEVO = 3
+ESTADO_PLAN_ANTERIOR = 4
+DEPOSITO_FINALIZADO = 2
+
+# Grano al que se agrupan las tareas una sola vez; todo lo demás (conteos,
+# máximos, porcentajes, promedios e indicadores) se deriva de esa tabla,
+# que tiene a lo sumo una fila por combinación de estas columnas
+COLUMNAS_GRANO = [
+    *COLUMNAS_ESTADISTICAS.values(),
+    "Estado_Tarea_Project_key",
+    "Deposito_Project_Key",
+]
+MEDIDAS_GRANO = ["Tareas", "Suma_Ejecucion", "Con_Ejecucion"]
+
+
+def porcentaje_texto(valor, decimales=0):
+    """51.6 → '51,6%' (coma decimal, como en la narrativa del libro)"""
+    return f"{valor:.{decimales}f}".replace(".", ",") + "%"
+
+
+# -------------------------
+# 2. Resultado
+# -------------------------
+class Distribucion:
+    """
+    Tareas por cada valor de una dimensión, en orden por nombre (sin
+    nulos), con su avance promedio. ``ancho`` es el largo de la barra
+    relativo al valor más frecuente y ``porcentaje`` la parte del total.
+    """
+
+    __slots__ = ("conteos", "avances", "total", "maximo")
+
+    def __init__(self, conteos, avances, total):
+        self.conteos = conteos
+        self.avances = avances
+        self.total = total
+        self.maximo = max(conteos.values()) if conteos else 1
+
+    def items(self):
+        return self.conteos.items()
+
+    def ancho(self, nombre):
+        return (self.conteos[nombre] / self.maximo) * 100
+
+    def porcentaje(self, nombre):
+        return self.conteos[nombre] / self.total * 100 if self.total else 0.0
+
+    def __len__(self):
+        return len(self.conteos)
+
+
+class IndicadoresPlan:
+    """
+    Cifras de la página de indicadores: el plan anual (todo lo que no es
+    nuevo: planeados y planes anteriores), los proyectos nuevos del año y
+    cuántos de cada grupo están finalizados; avances promedio de 0 a 100.
+    """
+
+    __slots__ = (
+        "plan_anual", "ejecutados_plan", "nuevos", "ejecutados_nuevos",
+        "avance_planeados", "avance_nuevos", "avance_plan_anterior",
+    )
+
+    def __init__(self, plan_anual, ejecutados_plan, nuevos, ejecutados_nuevos,
+                 avance_planeados, avance_nuevos, avance_plan_anterior):
+        self.plan_anual = plan_anual
+        self.ejecutados_plan = ejecutados_plan
+        self.nuevos = nuevos
+        self.ejecutados_nuevos = ejecutados_nuevos
+        self.avance_planeados = avance_planeados
+        self.avance_nuevos = avance_nuevos
+        self.avance_plan_anterior = avance_plan_anterior
+
+    @property
+    def total(self):
+        return self.plan_anual + self.nuevos
+
+    @property
+    def cumplimiento(self):
+        """Finalizados del plan anual frente a lo planificado (0 a 100)"""
+        return self.ejecutados_plan / self.plan_anual * 100 if self.plan_anual else 0.0
+
+    @property
+    def incremento(self):
+        """Crecimiento del total por los proyectos nuevos (0 a 100)"""
+        return self.nuevos / self.plan_anual * 100 if self.plan_anual else 0.0
+
+
+class Estadisticas:
+    """
+    Todos los agregados que muestran las páginas del libro, calculados de
+    una sola agrupación de las tareas (ver resumir_grano).
+    """
+
+    __slots__ = ("total_tareas", "avance_promedio", "por_deposito", "por_gerencia",
+                 "por_estado", "plan")
+
+    def __init__(self, total_tareas, avance_promedio, por_deposito, por_gerencia,
+                 por_estado, plan):
+        self.total_tareas = total_tareas
+        self.avance_promedio = avance_promedio
+        self.por_deposito = por_deposito
+        self.por_gerencia = por_gerencia
+        self.por_estado = por_estado
+        self.plan = plan
+
+
+# -------------------------
+# 3. Cálculo
+# -------------------------
+def _codigos(serie):
+    """Código entero por fila (-1 = nulo) y los valores de cada código"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), pd.Series(serie.cat.categories)
+    codigos, valores = pd.factorize(serie)
+    return codigos, pd.Series(valores)
+
+
+def agregar_grano(df):
+    """
+    Agrupa ``df`` a COLUMNAS_GRANO en una pasada: tareas, suma y cantidad
+    de valores de Porcentaje_Ejecucion por combinación (nulos incluidos).
+
+    Cada fila recibe un solo entero que combina los códigos de sus columnas
+    (las categorías ya los traen) y los totales salen de np.bincount, sin el
+    costo de un groupby por varias claves.
+    """
+    combinado = np.zeros(len(df), dtype=np.int64)
+    columnas = []
+    combinaciones = 1
+    for columna in COLUMNAS_GRANO:
+        codigos, valores = _codigos(df[columna])
+        base = len(valores) + 1  # el 0 queda para los nulos
+        combinado *= base
+        combinado += codigos
+        combinado += 1
+        combinaciones *= base
+        columnas.append((columna, valores, base))
+
+    if combinaciones <= max(len(df), 1 << 16):
+        grupos = None
+    else:
+        # Demasiadas combinaciones posibles para un arreglo denso
+        grupos, combinado = np.unique(combinado, return_inverse=True)
+        combinaciones = len(grupos)
+
+    porcentaje = df["Porcentaje_Ejecucion"].to_numpy(dtype="float64", na_value=np.nan)
+    con_valor = ~np.isnan(porcentaje)
+    tareas = np.bincount(combinado, minlength=combinaciones)
+    suma = np.bincount(combinado, np.where(con_valor, porcentaje, 0.0), minlength=combinaciones)
+    cantidad = np.bincount(combinado, con_valor, minlength=combinaciones)
+
+    presentes = np.flatnonzero(tareas)
+    clave = presentes if grupos is None else grupos[presentes]
+    grano = {}
+    for columna, valores, base in reversed(columnas):
+        # reindex con -1 (nulo) deja NaN/<NA>
+        grano[columna] = valores.reindex(clave % base - 1).array
+        clave = clave // base
+    grano = pd.DataFrame({columna: grano[columna] for columna in COLUMNAS_GRANO})
+    grano["Tareas"] = tareas[presentes]
+    grano["Suma_Ejecucion"] = suma[presentes]
+    grano["Con_Ejecucion"] = cantidad[presentes].astype(np.int64)
+    return grano
+
+
+def _avance(suma, cantidad):
+    return float(suma) / float(cantidad) * 100 if cantidad else 0.0
+
+
+def _clave(grano, columna):
+    # Enteros con nulos (Int16), float de SQL o object tras concatenar: float con NaN
+    return pd.to_numeric(grano[columna], errors="coerce").astype("float64")
+
+
+def resumir_grano(grano):
+    """
+    Estadisticas a partir de una tabla con COLUMNAS_GRANO + MEDIDAS_GRANO
+    (de agregar_grano, de AcumuladorEstadisticas o de la consulta SQL).
+    """
+    total = int(grano["Tareas"].sum())
+
+    distribuciones = {}
+    for atributo, columna in COLUMNAS_ESTADISTICAS.items():
+        # Mismo criterio que un groupby por la columna: sin nulos y por nombre
+        por_valor = grano.groupby(grano[columna].astype(object))[MEDIDAS_GRANO].sum()
+        distribuciones[atributo] = Distribucion(
+            dict(zip(por_valor.index, por_valor["Tareas"].astype(int).tolist())),
+            {
+                nombre: _avance(suma, cantidad) for nombre, suma, cantidad in zip(
+                    por_valor.index, por_valor["Suma_Ejecucion"], por_valor["Con_Ejecucion"]
+                )
+            },
+            total,
+        )
+
+    estado = _clave(grano, "Estado_Tarea_Project_key")
+    finalizado = _clave(grano, "Deposito_Project_Key") == DEPOSITO_FINALIZADO
+    nuevo = estado == ESTADO_NUEVO
+    plan_anterior = estado == ESTADO_PLAN_ANTERIOR
+    planeado = ~nuevo & ~plan_anterior
+
+    def medida(mascara, columna="Tareas"):
+        return grano.loc[mascara, columna].sum()
+
+    def avance(mascara):
+        return _avance(medida(mascara, "Suma_Ejecucion"), medida(mascara, "Con_Ejecucion"))
+
+    plan = IndicadoresPlan(
+        plan_anual=int(medida(~nuevo)),
+        ejecutados_plan=int(medida(~nuevo & finalizado)),
+        nuevos=int(medida(nuevo)),
+        ejecutados_nuevos=int(medida(nuevo & finalizado)),
+        avance_planeados=avance(planeado),
+        avance_nuevos=avance(nuevo),
+        avance_plan_anterior=avance(plan_anterior),
+    )
+    return Estadisticas(
+        total_tareas=total,
+        avance_promedio=_avance(grano["Suma_Ejecucion"].sum(), grano["Con_Ejecucion"].sum()),
+        plan=plan,
+        **distribuciones,
+    )
+
+
+class AcumuladorEstadisticas:
+    """
+    Estadísticas de un libro que se lee por bloques: cada bloque se agrupa
+    al grano y se suma a lo acumulado, así la memoria no depende del total
+    de tareas.
+
+        acumulador = AcumuladorEstadisticas()
+        for bloque in bloques:
+            acumulador.agregar(bloque)
+        estadisticas = acumulador.resultado()
+    """
+
+    def __init__(self):
+        self._grano = None
+
+    def agregar(self, df):
+        grano = agregar_grano(df)
+        if self._grano is not None:
+            grano = pd.concat([self._grano, grano], ignore_index=True)
+            # Los nombres llegan como categorías distintas en cada bloque
+            grano[list(COLUMNAS_ESTADISTICAS.values())] = (
+                grano[list(COLUMNAS_ESTADISTICAS.values())].astype(object)
+            )
+            grano = grano.groupby(COLUMNAS_GRANO, dropna=False, sort=False)[MEDIDAS_GRANO] \
+                .sum().reset_index()
+        self._grano = grano
+
+    def resultado(self):
+        if self._grano is None:
+            return resumir_grano(agregar_grano(pd.DataFrame(
+                columns=COLUMNAS_GRANO + ["Porcentaje_Ejecucion"]
+            )))
+        return resumir_grano(self._grano)
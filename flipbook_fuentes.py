@@ -0,0 +1,221 @@
+from sqlalchemy import create_engine
+from abc import ABC, abstractmethod
+import argparse
+import logging
+import os
+import random
+import re
+import sqlite3
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# 1. SQL Server (DWH)
+# -------------------------
+CONNECTION_STRING = (
+    r'mssql+pyodbc:///?odbc_connect='
+    r'Driver={SQL Server};'
+    r'Server=PSR-S670-N\BIGDATA;'
+    r'Database=DWH_INCOLMOTOS;'
+    r'Trusted_Connection=yes'
+)
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def conectar_db():
+    """
+    Devuelve el engine compartido del proceso (se crea una sola vez, con pool)
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_engine(
+                CONNECTION_STRING,
+                pool_size=5,
+                max_overflow=5,
+                pool_pre_ping=True,
+            )
+    return _engine
+
+
+class FuenteDatos(ABC):
+    """
+    Origen de datos de AccesoDatos.
+
+    Las consultas se escriben en T-SQL contra [DWH_INCOLMOTOS]; cada fuente
+    entrega su engine y adapta el SQL a su dialecto. ``nombre`` forma parte
+    de la clave de los snapshots para no mezclar resultados de fuentes
+    distintas.
+    """
+
+    nombre = "base"
+
+    def __init__(self):
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        with self._lock:
+            if self._engine is None:
+                self._engine = self.crear_engine()
+        return self._engine
+
+    @abstractmethod
+    def crear_engine(self):
+        """Engine de SQLAlchemy de la fuente (se crea una sola vez, ver ``engine``)"""
+
+    def adaptar_sql(self, query):
+        return query
+
+
+class FuenteSQLServer(FuenteDatos):
+    """DWH_INCOLMOTOS en SQL Server (solo en equipos del dominio)"""
+
+    nombre = "sqlserver"
+
+    def crear_engine(self):
+        return conectar_db()
+
+
+# -------------------------
+# 2. SQLite local
+# -------------------------
+ESQUEMA_LOCAL = Path(__file__).parent / "fixtures" / "dwh_esquema.sql"
+
+# [DWH_INCOLMOTOS].[ti].[Dim_Tareas_Project] -> ti_Dim_Tareas_Project
+_TABLA_TSQL = re.compile(r"\[DWH_INCOLMOTOS\]\.\[(\w+)\]\.\[(\w+)\]")
+_IDENTIFICADOR_TSQL = re.compile(r"\[(\w+)\]")
+
+
+class FuenteSQLite(FuenteDatos):
+    """
+    Copia local del DWH en un archivo SQLite (ver crear_dwh_local).
+    Sirve para desarrollar, perfilar y medir el render sin acceso al dominio.
+    """
+
+    nombre = "sqlite"
+
+    def __init__(self, ruta):
+        super().__init__()
+        self.ruta = Path(ruta)
+        self.nombre = f"sqlite:{self.ruta.resolve()}"
+
+    def crear_engine(self):
+        if not self.ruta.exists():
+            raise FileNotFoundError(
+                f"No existe {self.ruta}; créela con: python flipbook_fuentes.py {self.ruta}"
+            )
+        return create_engine(f"sqlite:///{self.ruta}")
+
+    def adaptar_sql(self, query):
+        query = _TABLA_TSQL.sub(r"\1_\2", query)
+        return _IDENTIFICADOR_TSQL.sub(r'"\1"', query)
+
+
+def fuente_por_defecto():
+    """
+    Fuente según FLIPBOOK_FUENTE: ``sqlserver`` (por defecto) o
+    ``sqlite:<ruta>`` para la copia local.
+    """
+    valor = os.environ.get("FLIPBOOK_FUENTE", "sqlserver")
+    if valor.startswith("sqlite:"):
+        return FuenteSQLite(valor[len("sqlite:"):])
+    if valor != "sqlserver":
+        raise ValueError(f"FLIPBOOK_FUENTE no reconocida: {valor}")
+    return FuenteSQLServer()
+
+
+# -------------------------
+# 3. Datos de prueba
+# -------------------------
+PALABRAS_TAREAS = [
+    "Migración", "Tablero", "Automatización", "Integración", "Modelo",
+    "Bodega", "Reporte", "Pipeline", "Portal", "Gobierno", "Calidad",
+    "Ventas", "Inventario", "Cartera", "Postventa", "Repuestos", "Nómina",
+    "Concesionarios", "Garantías", "Pronóstico", "Datos", "Clientes",
+]
+
+
+def crear_dwh_local(ruta, n_tareas=50, n_encuestas=17, semilla=0):
+    """
+    Crea (o reemplaza) un SQLite con el esquema de fixtures/dwh_esquema.sql
+    y ``n_tareas`` tareas sintéticas, repartidas en tres jefaturas con la
+    mayoría en la 2. Con la misma semilla siempre se generan los mismos datos.
+    """
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    if ruta.exists():
+        ruta.unlink()
+
+    rnd = random.Random(semilla)
+    hoy = date(2026, 1, 1)
+
+    tareas = []
+    for key in range(1, n_tareas + 1):
+        inicio = hoy + timedelta(days=rnd.randint(-365, 180))
+        fin = inicio + timedelta(days=rnd.randint(15, 240))
+        nombre = " ".join(rnd.sample(PALABRAS_TAREAS, rnd.randint(2, 4)))
+        notas = None if rnd.random() < 0.15 else (
+            f"Avance de {nombre.lower()}: " + " ".join(rnd.choices(PALABRAS_TAREAS, k=20)).lower()
+        )
+        tareas.append((
+            key,
+            rnd.randint(1, max(1, n_tareas // 5)),
+            rnd.choices([1, 2, 3], weights=[2, 6, 2])[0],
+            f"{rnd.randint(1, 9)}.{rnd.randint(1, 20)}",
+            f"TI-{key:05d}",
+            f"{nombre} {key}",
+            f"Descripción de {nombre.lower()}",
+            rnd.randint(1, 4),
+            rnd.randint(1, 6),
+            rnd.randint(1, 6),
+            rnd.randint(1, 8),
+            rnd.randint(1, 5),
+            rnd.randint(1, 5),
+            round(rnd.random(), 2),
+            rnd.randint(1, 5),
+            inicio.isoformat(),
+            fin.isoformat(),
+            (fin + timedelta(days=rnd.randint(0, 30))).isoformat(),
+            notas,
+            (hoy + timedelta(days=rnd.randint(0, 30))).isoformat(),
+        ))
+
+    encuestas = [
+        (key, rnd.randint(1, max(1, n_tareas // 5)),
+         *(rnd.choices([3, 4, 5], weights=[1, 3, 4])[0] for _ in range(4)))
+        for key in range(1, n_encuestas + 1)
+    ]
+
+    with sqlite3.connect(ruta) as conn:
+        conn.executescript(ESQUEMA_LOCAL.read_text(encoding="utf-8"))
+        conn.executemany(
+            f"INSERT INTO ti_Dim_Tareas_Project VALUES ({', '.join('?' * 20)})", tareas
+        )
+        conn.executemany(
+            "INSERT INTO admn_Fact_Encuesta_Proyectos VALUES (?, ?, ?, ?, ?, ?)", encuestas
+        )
+    conn.close()
+
+    logger.info(f"🗄️  DWH local creado en {ruta}: {n_tareas} tareas, {n_encuestas} encuestas")
+    return ruta
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Crea una copia local (SQLite) del DWH")
+    parser.add_argument("ruta", nargs="?", default=".cache/dwh_local.sqlite")
+    parser.add_argument("--tareas", type=int, default=50)
+    parser.add_argument("--encuestas", type=int, default=17)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    crear_dwh_local(args.ruta, args.tareas, args.encuestas, args.semilla)
+    logger.info(f"Úselo con: FLIPBOOK_FUENTE=sqlite:{args.ruta}")
@@ -0,0 +1,591 @@
+import base64
+import hashlib
+import json
+import logging
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageFilter, ImageOps, features
+    HAY_PIL = True
+except ImportError:
+    HAY_PIL = False
+
+# -------------------------
+# 1. Configuración
+# -------------------------
+# Derivadas de las imágenes (se pueden borrar sin riesgo: se regeneran)
+CARPETA_DERIVADAS = os.environ.get("FLIPBOOK_DERIVADAS", "img/derivadas")
+# webp (rápido, soporte universal) o avif (~30% más liviano, ~7x más lento de codificar)
+FORMATO_DERIVADAS = os.environ.get("FLIPBOOK_FORMATO_IMG", "webp")
+OPCIONES_FORMATO = {
+    "webp": {"quality": 80, "method": 4},
+    "avif": {"quality": 60, "speed": 6},
+}
+# Placeholder (LQIP) de cada imagen: lado mayor en px; el navegador lo
+# agranda suavizado y se ve como una versión borrosa. Siempre webp sin
+# pérdida: con pérdida, a este tamaño se pierde casi todo el color
+LADO_LQIP = 12
+OPCIONES_LQIP = {"lossless": True, "quality": 100, "method": 6}
+# Cambiar si cambia la forma de procesar (invalida todas las derivadas)
+VERSION_DERIVADAS = 1
+
+# Densidades de pantalla de cada derivada (2: pantallas retina); nunca
+# más resolución que la de la original
+DENSIDADES = (1, 2)
+# Una imagen va en una caja (ancho, alto en px) si recortada a su
+# proporción conserva al menos esta fracción y no hay que agrandarla
+CONSERVAR_MINIMO = 0.5
+
+# Cajas de las páginas fijas: libro abierto (portada) y una sola página
+CAJA_LIBRO = (1056, 640)
+CAJA_PAGINA = (528, 640)
+
+# Catálogo de las carpetas de imágenes (se puede borrar sin riesgo: se
+# reconstruye leyendo cada archivo una vez)
+CATALOGO_IMAGENES = os.environ.get("FLIPBOOK_CATALOGO_IMG", ".cache/imagenes.json")
+VERSION_CATALOGO = 2
+
+# Archivos que entran al catálogo: extensión → tipo MIME
+TIPOS_MEDIOS = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".mp4": "video/mp4",
+    ".webm": "video/webm",
+    ".ogg": "video/ogg",
+}
+# Formatos que se derivan; el resto (GIF animados, videos) se usa tal cual
+EXTENSIONES_DERIVABLES = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def url_local(ruta):
+    """URL de un archivo del proyecto vista desde output/ (donde queda el HTML)"""
+    return "../" + quote(Path(os.path.relpath(ruta)).as_posix())
+
+
+# -------------------------
+# 2. Catálogo
+# -------------------------
+class EntradaCatalogo:
+    """
+    Un archivo de una carpeta de imágenes: ``tamano`` (bytes) y
+    ``mtime_ns`` para saber si cambió, ``huella`` (sha256 del contenido),
+    ``ancho`` y ``alto`` en píxeles tal como está guardada, ``orientacion``
+    EXIF (1 = normal), ``tipo`` MIME y ``foco``, el punto de interés (x, y
+    de 0 a 1 sobre la imagen como se ve) en el que se centran los
+    recortes. Medidas, orientación y foco son None en videos (o si no se
+    pudo leer la imagen).
+    """
+
+    __slots__ = (
+        "ruta", "tamano", "mtime_ns", "huella", "ancho", "alto", "orientacion", "tipo", "foco",
+    )
+
+    def __init__(self, ruta, tamano, mtime_ns, huella, ancho, alto, orientacion, tipo, foco=None):
+        self.ruta = ruta
+        self.tamano = tamano
+        self.mtime_ns = mtime_ns
+        self.huella = huella
+        self.ancho = ancho
+        self.alto = alto
+        self.orientacion = orientacion
+        self.tipo = tipo
+        # El JSON lo guarda como lista
+        self.foco = tuple(foco) if foco is not None else None
+
+    @property
+    def es_imagen(self):
+        return self.tipo.startswith("image/")
+
+    @property
+    def medidas(self):
+        """Ancho y alto como se ve (rotada según la orientación EXIF), o None"""
+        if self.ancho is None:
+            return None
+        if self.orientacion in (5, 6, 7, 8):
+            return self.alto, self.ancho
+        return self.ancho, self.alto
+
+    @property
+    def derivable(self):
+        return self.medidas is not None and self.ruta.lower().endswith(EXTENSIONES_DERIVABLES)
+
+    def como_dict(self):
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+
+def _sha256_archivo(ruta):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _foco(img):
+    """
+    Punto de interés de ``img`` (x, y de 0 a 1): el centro de los bordes
+    (donde hay detalle) en una copia de 64 px, acercado a la mitad hacia el
+    centro de la imagen para que un fondo con textura no lo arrastre.
+    """
+    # Las paletas con transparencia pasan por RGBA (si no, Pillow avisa)
+    gris = (img.convert("RGBA") if img.mode == "P" else img).convert("L")
+    gris.thumbnail((64, 64))
+    ancho, alto = gris.size
+    if ancho < 3 or alto < 3:
+        return 0.5, 0.5
+    # FIND_EDGES deja un borde artificial en el marco: se descarta
+    bordes = gris.filter(ImageFilter.FIND_EDGES).crop((1, 1, ancho - 1, alto - 1))
+    ancho, alto = bordes.size
+    total = suma_x = suma_y = 0
+    for i, valor in enumerate(bordes.tobytes()):
+        total += valor
+        suma_x += valor * (i % ancho)
+        suma_y += valor * (i // ancho)
+    if not total:
+        return 0.5, 0.5
+    x = (suma_x / total + 0.5) / ancho
+    y = (suma_y / total + 0.5) / alto
+    return round(0.5 + (x - 0.5) / 2, 3), round(0.5 + (y - 0.5) / 2, 3)
+
+
+def _leer_entrada(ruta, info, tipo):
+    """Entrada de un archivo nuevo o modificado: contenido y, si es imagen, cabecera y foco"""
+    ancho = alto = orientacion = foco = None
+    if HAY_PIL and tipo.startswith("image/"):
+        try:
+            with Image.open(ruta) as img:
+                ancho, alto = img.size
+                orientacion = img.getexif().get(0x0112, 1)
+                # El foco sí decodifica, pero a lo sumo una vez por archivo
+                # (y los JPEG ya reducidos)
+                img.draft("RGB", (128, 128))
+                foco = _foco(ImageOps.exif_transpose(img))
+        except OSError as e:
+            logger.warning(f"⚠️  No se pudo leer la imagen {ruta}: {e}")
+    return EntradaCatalogo(
+        ruta, info.st_size, info.st_mtime_ns, _sha256_archivo(ruta),
+        ancho, alto, orientacion, tipo, foco,
+    )
+
+
+class CatalogoImagenes:
+    """
+    Catálogo persistente (JSON en ``ruta``) de los archivos de las carpetas
+    de imágenes. ``actualizar`` recorre la carpeta con os.scandir y solo
+    lee los archivos nuevos o cuyo tamaño o fecha cambiaron; del resto usa
+    lo guardado, así un build no vuelve a leer megas de imágenes que ya
+    conoce.
+
+        entradas = CatalogoImagenes().actualizar("img")
+    """
+
+    def __init__(self, ruta=CATALOGO_IMAGENES):
+        self.ruta = Path(ruta)
+        self._entradas = {}
+        try:
+            datos = json.loads(self.ruta.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            datos = {}
+        if datos.get("version") == VERSION_CATALOGO:
+            self._entradas = {
+                ruta: EntradaCatalogo(**entrada) for ruta, entrada in datos["archivos"].items()
+            }
+
+    def actualizar(self, carpeta):
+        """Entradas de los archivos de ``carpeta`` (en orden por nombre), al día con el disco"""
+        if not os.path.isdir(carpeta):
+            return []
+        with os.scandir(carpeta) as it:
+            archivos = sorted(
+                (archivo for archivo in it
+                 if archivo.is_file() and Path(archivo.name).suffix.lower() in TIPOS_MEDIOS),
+                key=lambda archivo: archivo.name,
+            )
+
+        # Las rutas se guardan con "/" en todos los sistemas, así el catálogo
+        # (y las claves de derivar_imagenes) no dependen de os.sep
+        entradas, leidas = [], 0
+        for archivo in archivos:
+            ruta = Path(carpeta, archivo.name).as_posix()
+            info = archivo.stat()
+            tipo = TIPOS_MEDIOS[Path(archivo.name).suffix.lower()]
+            entrada = self._entradas.get(ruta)
+            if (
+                entrada is None
+                or (entrada.tamano, entrada.mtime_ns) != (info.st_size, info.st_mtime_ns)
+                # Sin medidas: se vuelve a intentar (p. ej. si ahora hay Pillow)
+                or (entrada.es_imagen and entrada.ancho is None and HAY_PIL)
+            ):
+                entrada = self._entradas[ruta] = _leer_entrada(ruta, info, tipo)
+                leidas += 1
+            entradas.append(entrada)
+
+        # Lo que ya no está en la carpeta (las demás carpetas no se tocan)
+        base = Path(carpeta)
+        presentes = {entrada.ruta for entrada in entradas}
+        quitadas = [
+            ruta for ruta in self._entradas
+            if Path(ruta).parent == base and ruta not in presentes
+        ]
+        for ruta in quitadas:
+            del self._entradas[ruta]
+
+        if leidas or quitadas:
+            self.guardar()
+            logger.info(
+                f"🗂️  Catálogo de {carpeta}: {len(entradas)} archivos, "
+                f"{leidas} leídos, {len(quitadas)} quitados"
+            )
+        return entradas
+
+    def guardar(self):
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        contenido = {
+            "version": VERSION_CATALOGO,
+            "archivos": {
+                ruta: entrada.como_dict() for ruta, entrada in sorted(self._entradas.items())
+            },
+        }
+        tmp = self.ruta.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(contenido, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.ruta)
+
+
+def catalogo_imagenes(carpeta="img", ruta=CATALOGO_IMAGENES):
+    """Entradas de ``carpeta`` según el catálogo en ``ruta`` (ver CatalogoImagenes)"""
+    return CatalogoImagenes(ruta).actualizar(carpeta)
+
+
+# -------------------------
+# 3. Emparejamiento e imágenes en las páginas
+# -------------------------
+def _region(medidas, caja):
+    """Parte más grande de la imagen (en px de la original) con la proporción de ``caja``"""
+    ancho, alto = medidas
+    if ancho * caja[1] > alto * caja[0]:
+        return alto * caja[0] / caja[1], alto
+    return ancho, ancho * caja[1] / caja[0]
+
+
+def compatible(medidas, caja):
+    """
+    Si una imagen de ``medidas`` puede ir en ``caja``: recortada a la
+    proporción de la caja conserva al menos CONSERVAR_MINIMO de la imagen
+    (un retrato no va a una doble página) y alcanza la resolución de la
+    caja sin agrandarse.
+    """
+    ancho_region, alto_region = _region(medidas, caja)
+    conservado = ancho_region * alto_region / (medidas[0] * medidas[1])
+    return conservado >= CONSERVAR_MINIMO and ancho_region >= caja[0]
+
+
+class ImagenResponsiva:
+    """
+    Una imagen con derivadas recortadas a la medida exacta de cada caja en
+    la que puede ir: ``variantes`` es {caja: ((url, ancho, alto), ...)}, de
+    menor a mayor densidad, y ``posiciones`` {caja: (x, y)}, dónde queda el
+    recorte dentro de la original (en %, como background-position).
+    ``original`` es la URL de la original, ``lqip`` el placeholder como
+    data URI y ``medidas`` las de la original como se ve (None si no se
+    conocen). Sin derivadas (GIF, sin Pillow) solo tiene la original y sus
+    medidas (ver imagen_original).
+    """
+
+    __slots__ = ("original", "variantes", "posiciones", "lqip", "medidas")
+
+    def __init__(self, original, variantes, posiciones, lqip=None, medidas=None):
+        self.original = original
+        self.variantes = variantes
+        self.posiciones = posiciones
+        self.lqip = lqip
+        self.medidas = medidas
+
+    def __repr__(self):
+        # Entra en la huella del build: debe ser estable entre ejecuciones
+        return (f"ImagenResponsiva({self.original!r}, {sorted(self.variantes.items())!r}, "
+                f"{sorted(self.posiciones.items())!r}, {self.lqip!r}, {self.medidas!r})")
+
+
+def imagen_original(entrada):
+    """ImagenResponsiva sin derivadas de una entrada del catálogo: la original y sus medidas"""
+    return ImagenResponsiva(url_local(entrada.ruta), {}, {}, medidas=entrada.medidas)
+
+
+def va_en(imagen, caja):
+    """
+    Si ``imagen`` (URL o ImagenResponsiva) puede ir en ``caja``: con
+    derivadas, si tiene una para la caja; sin derivadas, según sus medidas
+    (ver compatible). Una URL o una imagen sin medidas va en todas.
+    """
+    if isinstance(imagen, str):
+        return True
+    if imagen.variantes:
+        return caja in imagen.variantes
+    return imagen.medidas is None or compatible(imagen.medidas, caja)
+
+
+class ImagenPagina:
+    """
+    Lo que recibe una plantilla como img_url: ``{img_url}`` es el src y
+    ``srcset``, ``sizes``, ``ancho`` y ``alto`` completan el <img> para que
+    el navegador baje la variante justa y reserve el espacio antes de
+    decodificarla. ``fondo`` es el estilo del contenedor de la imagen: el
+    placeholder, que se ve mientras la imagen no llega ("" si no tiene).
+    """
+
+    __slots__ = ("src", "srcset", "sizes", "ancho", "alto", "fondo")
+
+    def __init__(self, src, srcset, sizes, ancho, alto, fondo=""):
+        self.src = src
+        self.srcset = srcset
+        self.sizes = sizes
+        self.ancho = ancho
+        self.alto = alto
+        self.fondo = fondo
+
+    def __str__(self):
+        return self.src
+
+    def __repr__(self):
+        # Parte de la clave de la caché de páginas
+        return (f"ImagenPagina({self.src!r}, {self.srcset!r}, {self.sizes!r}, "
+                f"{self.ancho!r}, {self.alto!r}, {self.fondo!r})")
+
+
+def imagen_pagina(imagen, caja):
+    """
+    ImagenPagina de ``imagen`` (URL o ImagenResponsiva) en ``caja`` (ancho,
+    alto en px del libro).
+
+    La derivada ya tiene la proporción de la caja, así que object-fit no
+    descarta nada: srcset lista sus densidades, sizes es el ancho de la
+    caja y width/height la caja misma.
+    """
+    ancho_caja, alto_caja = caja
+    if isinstance(imagen, str):
+        # Sin derivadas: la original, con la caja como medidas
+        return ImagenPagina(
+            imagen, f"{imagen} {ancho_caja}w", f"{ancho_caja}px", ancho_caja, alto_caja
+        )
+    if caja not in imagen.variantes:
+        # Sin derivadas o caja para la que no se derivó (p. ej. un layout
+        # registrado después)
+        return imagen_pagina(imagen.original, caja)
+
+    variantes = imagen.variantes[caja]
+    srcset = ", ".join(f"{u} {w}w" for u, w, _ in variantes)
+    # El placeholder es la imagen entera: se ubica donde cae el recorte
+    x, y = imagen.posiciones[caja]
+    fondo = f"background: url({imagen.lqip}) {x:g}% {y:g}% / cover" if imagen.lqip else ""
+    return ImagenPagina(variantes[0][0], srcset, f"{ancho_caja}px", ancho_caja, alto_caja, fondo)
+
+
+# -------------------------
+# 4. Derivadas
+# -------------------------
+def _recorte(medidas, foco, caja):
+    """
+    Recorte de una imagen de ``medidas`` para ``caja``: la región más grande
+    con la proporción de la caja, centrada en ``foco`` sin salirse de la
+    imagen. Devuelve la región en fracciones de la original (x0, y0, x1,
+    y1), su posición (en %, como background-position) y las medidas de
+    salida de cada densidad de DENSIDADES, sin pasar la resolución de la
+    región.
+    """
+    ancho, alto = medidas
+    ancho_region, alto_region = _region(medidas, caja)
+    x0 = min(max(foco[0] * ancho - ancho_region / 2, 0), ancho - ancho_region)
+    y0 = min(max(foco[1] * alto - alto_region / 2, 0), alto - alto_region)
+    region = tuple(round(valor, 4) for valor in (
+        x0 / ancho, y0 / alto, (x0 + ancho_region) / ancho, (y0 + alto_region) / alto,
+    ))
+    posicion = (
+        round(100 * x0 / (ancho - ancho_region), 1) if ancho - ancho_region >= 1 else 50,
+        round(100 * y0 / (alto - alto_region), 1) if alto - alto_region >= 1 else 50,
+    )
+
+    salidas = []
+    for densidad in DENSIDADES:
+        escala = min(densidad, ancho_region / caja[0])
+        salida = max(1, round(caja[0] * escala)), max(1, round(caja[1] * escala))
+        # Una densidad que apenas agrega resolución no vale otro archivo
+        if not salidas or salida[0] >= salidas[-1][0] * 1.25:
+            salidas.append(salida)
+    return region, posicion, salidas
+
+
+def _medidas_lqip(ancho, alto):
+    """Medidas del placeholder: la imagen entera en LADO_LQIP px de lado mayor"""
+    escala = min(1.0, LADO_LQIP / max(ancho, alto))
+    return max(1, round(ancho * escala)), max(1, round(alto * escala))
+
+
+def _derivar(origen, destino, region, salida, formato, opciones):
+    with Image.open(origen) as img:
+        # JPEG: decodifica ya reducido (potencias de 2) si la región sigue
+        # teniendo las medidas de salida en cualquier orientación
+        necesario = max(salida[0] / (region[2] - region[0]), salida[1] / (region[3] - region[1]))
+        img.draft("RGB", (math.ceil(necesario), math.ceil(necesario)))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+        ancho, alto = img.size
+        img = img.resize(salida, Image.LANCZOS, box=(
+            region[0] * ancho, region[1] * alto, region[2] * ancho, region[3] * alto,
+        ))
+        tmp = destino.with_suffix(f".{os.getpid()}.tmp")
+        # Sin EXIF ni perfiles: solo los píxeles
+        img.save(tmp, formato.upper(), **opciones)
+    os.replace(tmp, destino)
+
+
+def formato_disponible(formato=FORMATO_DERIVADAS):
+    if formato not in OPCIONES_FORMATO:
+        raise ValueError(
+            f"Formato de imagen no soportado: {formato} (opciones: {list(OPCIONES_FORMATO)})"
+        )
+    if formato != "webp" and not features.check(formato):
+        logger.warning(f"⚠️  Pillow sin soporte para {formato}, se usa webp")
+        return "webp"
+    return formato
+
+
+def _archivo_derivada(destino, ruta, huella, region, salida, formato, opciones):
+    """Nombre de una derivada: original, medidas finales y hash de todo lo que la define"""
+    clave = hashlib.blake2b(
+        f"{huella}|{region}|{salida}|{formato}|{sorted(opciones.items())!r}|{VERSION_DERIVADAS}"
+        .encode("utf-8"),
+        digest_size=6,
+    ).hexdigest()
+    return destino / f"{Path(ruta).stem}.{salida[0]}x{salida[1]}.{clave}.{formato}"
+
+
+def derivar_imagenes(entradas, cajas, destino=CARPETA_DERIVADAS, formato=FORMATO_DERIVADAS,
+                     solo_compatibles=True):
+    """
+    Derivadas de cada imagen derivable de ``entradas`` (del catálogo) para
+    cada una de ``cajas`` (ancho, alto en px) en la que puede ir (ver
+    compatible): recortadas a la medida exacta de la caja, en cada densidad
+    de DENSIDADES, más su placeholder (LQIP, como data URI). Devuelve
+    {ruta: ImagenResponsiva}; las demás entradas se ignoran.
+
+    Una caja en la que no entra ninguna imagen las recibe todas (mejor un
+    recorte forzado que un layout sin imagen); con ``solo_compatibles=False``
+    todas van en todas (p. ej. la imagen fija de una página).
+
+    Los archivos se nombran por el contenido de la original y los
+    parámetros (recorte, medidas, formato, calidad): una imagen que no
+    cambió nunca se vuelve a procesar, y si cambia se genera con otro
+    nombre (las cachés del navegador no sirven la versión vieja).
+
+    Contenido, medidas y foco de cada original salen del catálogo: solo se
+    abren las originales de las derivadas que faltan. Sin Pillow devuelve
+    {} y el libro usa las originales.
+    """
+    if not HAY_PIL:
+        logger.warning("⚠️  Pillow no está instalado: se usan las imágenes originales")
+        return {}
+
+    formato = formato_disponible(formato)
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+    opciones = OPCIONES_FORMATO[formato]
+
+    derivables = [entrada for entrada in entradas if entrada.derivable]
+    por_caja = {}
+    for caja in dict.fromkeys(cajas):
+        rutas = {
+            entrada.ruta for entrada in derivables
+            if not solo_compatibles or compatible(entrada.medidas, caja)
+        }
+        if not rutas and derivables:
+            logger.warning(
+                f"⚠️  Ninguna imagen es adecuada para {caja[0]}x{caja[1]}: se usan todas"
+            )
+            rutas = {entrada.ruta for entrada in derivables}
+        por_caja[caja] = rutas
+
+    variantes, pendientes, archivos, lqips = {}, {}, set(), {}
+    bytes_originales = 0
+    for entrada in derivables:
+        ruta, huella, medidas = entrada.ruta, entrada.huella, entrada.medidas
+        foco = entrada.foco or (0.5, 0.5)
+        bytes_originales += entrada.tamano
+
+        imagen = variantes[ruta] = ImagenResponsiva(url_local(ruta), {}, {}, medidas=medidas)
+        for caja, rutas in por_caja.items():
+            if ruta not in rutas:
+                continue
+            region, imagen.posiciones[caja], salidas = _recorte(medidas, foco, caja)
+            candidatas = []
+            for salida in salidas:
+                archivo = _archivo_derivada(
+                    destino, ruta, huella, region, salida, formato, opciones
+                )
+                if not archivo.exists():
+                    pendientes[archivo] = (ruta, region, salida, formato, opciones)
+                archivos.add(archivo)
+                candidatas.append((url_local(archivo), *salida))
+            imagen.variantes[caja] = tuple(candidatas)
+
+        salida = _medidas_lqip(*medidas)
+        lqips[ruta] = _archivo_derivada(
+            destino, ruta, huella, (0, 0, 1, 1), salida, "webp", OPCIONES_LQIP
+        )
+        if not lqips[ruta].exists():
+            pendientes[lqips[ruta]] = (ruta, (0, 0, 1, 1), salida, "webp", OPCIONES_LQIP)
+
+    if pendientes:
+        # Pillow libera el GIL al decodificar, redimensionar y codificar
+        trabajos = [(ruta, archivo, *resto) for archivo, (ruta, *resto) in pendientes.items()]
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            list(pool.map(lambda trabajo: _derivar(*trabajo), trabajos))
+
+    # Los placeholders van dentro del HTML (unos cientos de bytes cada uno)
+    bytes_lqip = 0
+    for ruta, archivo in lqips.items():
+        contenido = archivo.read_bytes()
+        bytes_lqip += len(contenido)
+        variantes[ruta].lqip = (
+            f"data:image/webp;base64,{base64.b64encode(contenido).decode('ascii')}"
+        )
+
+    bytes_derivadas = sum(archivo.stat().st_size for archivo in archivos)
+    logger.info(
+        f"🖼️  Imágenes: {len(variantes)} originales ({bytes_originales / 1024 / 1024:,.1f} MB) → "
+        f"{len(archivos)} derivadas {formato} ({bytes_derivadas / 1024 / 1024:,.1f} MB) "
+        f"y {len(lqips)} placeholders ({bytes_lqip / 1024:,.1f} KB), {len(pendientes)} nuevas"
+    )
+    if solo_compatibles:
+        logger.info("🧩 Imágenes por caja: " + ", ".join(
+            f"{ancho}x{alto}: {len(rutas)}" for (ancho, alto), rutas in por_caja.items()
+        ))
+    return variantes
+
+
+def imagenes_fijas(fijas, carpeta="img", derivadas=True):
+    """
+    {nombre: ImagenPagina} de las imágenes de páginas fijas (portada, foto):
+    ``fijas`` es {nombre: (ruta, caja)}. Cada una se deriva solo para su
+    caja, aunque no sea la proporción ideal.
+    """
+    # Mismas claves que el catálogo (con "/"), escriba como se escriba la ruta
+    fijas = {nombre: (Path(ruta).as_posix(), caja) for nombre, (ruta, caja) in fijas.items()}
+    variantes = {}
+    if derivadas:
+        entradas = {entrada.ruta: entrada for entrada in catalogo_imagenes(carpeta)}
+        for ruta, caja in fijas.values():
+            if ruta in entradas:
+                variantes.update(derivar_imagenes([entradas[ruta]], [caja], solo_compatibles=False))
+    return {
+        nombre: imagen_pagina(variantes.get(ruta, url_local(ruta)), caja)
+        for nombre, (ruta, caja) in fijas.items()
+    }
@@ -0,0 +1,396 @@
+import numpy as np
+import os
+from collections import deque
+from flipbook_datos import fecha_texto, texto
+from flipbook_imagenes import imagen_pagina, va_en
+from flipbook_plantillas import cargar_plantilla, archivos_plantillas
+from flipbook_salida import archivos_codigo
+
+# -------------------------
+# 1. Tareas para los layouts
+# -------------------------
+COLORES_DEPOSITO = {
+    1: "#FF0000",
+    2: "#0A2D82",
+    3: "#616365",
+    4: "#BCBDBC",
+    5: "#FF6A00"
+}
+
+
+def color_por_deposito(deposito_key):
+    return COLORES_DEPOSITO.get(deposito_key, "#999999")
+
+
+# Columnas del DataFrame de tareas que usan las páginas
+CAMPOS_TAREA = (
+    "Tarea_Project_Key",
+    "Codigo_Tarea",
+    "Nombre_Tarea_Project",
+    "Estado_Tarea_Project_key",
+    "Deposito_Project_Key",
+    "Porcentaje_Ejecucion",
+    "Fecha_Inicio",
+    "Fecha_Fin",
+    "Fecha_Estimada_Entrega",
+    "Notas_IA_Project",
+    "Nombre_Deposito_Project",
+    "Nom_Gcia_Project",
+    "Nom_Estado_Tarea_Project",
+)
+
+
+class Tarea:
+    """
+    Una tarea lista para renderizar: las columnas de CAMPOS_TAREA como
+    atributos (las fechas ya como texto) y los campos derivados (porcentaje,
+    notas recortadas, color, partes del nombre) calculados una sola vez.
+    """
+
+    __slots__ = CAMPOS_TAREA + (
+        "porcentaje", "notas", "color", "nombre_inicio", "nombre_resto",
+    )
+
+    def __init__(self, Tarea_Project_Key, Codigo_Tarea, Nombre_Tarea_Project,
+                 Estado_Tarea_Project_key, Deposito_Project_Key,
+                 Porcentaje_Ejecucion, Fecha_Inicio, Fecha_Fin,
+                 Fecha_Estimada_Entrega, Notas_IA_Project,
+                 Nombre_Deposito_Project, Nom_Gcia_Project,
+                 Nom_Estado_Tarea_Project):
+        self.Tarea_Project_Key = Tarea_Project_Key
+        self.Codigo_Tarea = Codigo_Tarea
+        self.Nombre_Tarea_Project = Nombre_Tarea_Project
+        self.Estado_Tarea_Project_key = Estado_Tarea_Project_key
+        self.Deposito_Project_Key = Deposito_Project_Key
+        self.Porcentaje_Ejecucion = Porcentaje_Ejecucion
+        # Las fechas llegan como datetime64 (ESQUEMA_TAREAS): se muestran sin hora
+        self.Fecha_Inicio = fecha_texto(Fecha_Inicio)
+        self.Fecha_Fin = fecha_texto(Fecha_Fin)
+        self.Fecha_Estimada_Entrega = fecha_texto(Fecha_Estimada_Entrega)
+        self.Notas_IA_Project = Notas_IA_Project
+        self.Nombre_Deposito_Project = Nombre_Deposito_Project
+        self.Nom_Gcia_Project = Nom_Gcia_Project
+        self.Nom_Estado_Tarea_Project = Nom_Estado_Tarea_Project
+
+        # Derivados
+        self.porcentaje = Porcentaje_Ejecucion * 100
+        self.notas = texto(Notas_IA_Project)[:100]
+        self.color = color_por_deposito(Deposito_Project_Key)
+        palabras = texto(Nombre_Tarea_Project).split()
+        self.nombre_inicio = palabras[0] if palabras else ""
+        self.nombre_resto = ' '.join(palabras[1:])
+
+
+def filas_tarea(df):
+    """Valores de CAMPOS_TAREA por fila (tuplas, vía itertuples)"""
+    return df[list(CAMPOS_TAREA)].itertuples(index=False, name=None)
+
+
+def tareas_desde_df(df):
+    """
+    Recorre el DataFrame por columnas (itertuples) y entrega objetos Tarea,
+    en lugar de una Series por fila como df.iterrows().
+    """
+    for valores in filas_tarea(df):
+        yield Tarea(*valores)
+
+
+# -------------------------
+# 2. Generadores de layouts
+# -------------------------
+# Cada layout es una plantilla de plantillas/ compilada a una función
+# layout(tarea, img_url); la función es tan rápida como la f-string original.
+PARAMETROS_LAYOUT = ("tarea", "img_url")
+
+
+def _layout(nombre):
+    return cargar_plantilla(nombre, PARAMETROS_LAYOUT, __name__).render
+
+
+layout_left_text = _layout("layout_left_text")            # Texto a la izquierda, imagen a la derecha
+layout_right_text = _layout("layout_right_text")          # Texto a la derecha, imagen a la izquierda
+layout_diagonal = _layout("layout_diagonal")              # División diagonal
+layout_center_margins = _layout("layout_center_margins")  # Márgenes laterales y contenido central
+layout_full_overlay = _layout("layout_full_overlay")      # Imagen de fondo completa y overlay de texto
+layout_grid = _layout("layout_grid")                      # Grid asimétrico
+
+
+# Layouts disponibles organizados por color de fondo
+LAYOUTS_POR_COLOR = {
+    "azul": [
+        layout_left_text,      # Azul
+        layout_full_overlay,   # Azul
+    ],
+    "oscuro": [
+        layout_right_text,     # Gris oscuro
+        layout_center_margins, # Negro
+        layout_grid,           # Negro
+    ],
+    "claro": [
+        layout_diagonal,       # Blanco/claro
+    ],
+}
+
+
+# Colores de fondo que pueden seguir a cada color (None: primera página).
+# Nunca dos páginas seguidas del mismo color.
+TRANSICIONES_COLOR = {
+    None: ("azul", "oscuro", "claro"),
+    "azul": ("oscuro", "claro"),
+    "oscuro": ("azul", "claro"),
+    "claro": ("azul", "oscuro"),
+}
+
+# Layouts que no pueden aparecer en dos páginas seguidas (aunque la tabla
+# de colores lo permita)
+LAYOUTS_SIN_REPETIR = set()
+
+# Caja (ancho, alto en px) que ocupa la imagen de cada layout en el libro
+# abierto de 1056x640, según el CSS; de ella salen srcset/sizes del <img>
+CAJA_IMAGEN_LAYOUT = {
+    layout_left_text: (686, 640),       # columna del 65%
+    layout_right_text: (655, 640),      # columna del 62%
+    layout_diagonal: (537, 448),        # 55% x 80% dentro de 40px de padding
+    layout_center_margins: (634, 640),  # centro del 60%
+    layout_full_overlay: (1056, 640),   # las dos páginas
+    layout_grid: (528, 320),            # celda superior derecha
+}
+# Caja de un layout registrado sin caja_imagen: una columna de imagen
+CAJA_IMAGEN_PREDETERMINADA = (686, 640)
+
+
+def registrar_layout(layout_func, color, repetir=True, caja_imagen=CAJA_IMAGEN_PREDETERMINADA,
+                     transiciones=None):
+    """
+    Agrega un layout al plan: ``color`` es su grupo de fondo (clave de
+    LAYOUTS_POR_COLOR/TRANSICIONES_COLOR), con ``repetir=False`` nunca se
+    usa en dos páginas seguidas y ``caja_imagen`` es lo que mide su imagen
+    (ancho, alto en px).
+
+    Un color nuevo necesita ``transiciones``: los colores existentes que
+    pueden ir antes y después de él (también puede abrir el libro).
+
+        registrar_layout(layout_rojo, "rojo", transiciones=("azul", "claro"))
+    """
+    if color not in TRANSICIONES_COLOR:
+        if not transiciones:
+            raise ValueError(
+                f"Color de layout desconocido: {color} (colores: "
+                f"{[c for c in TRANSICIONES_COLOR if c is not None]}); "
+                f"un color nuevo necesita transiciones="
+            )
+        desconocidos = [c for c in transiciones if c not in TRANSICIONES_COLOR or c is None]
+        if desconocidos:
+            raise ValueError(f"Transiciones a colores desconocidos: {desconocidos}")
+        TRANSICIONES_COLOR[color] = tuple(transiciones)
+        for anterior in (None, *transiciones):
+            TRANSICIONES_COLOR[anterior] += (color,)
+    elif transiciones is not None:
+        raise ValueError(
+            f"El color {color} ya existe: sus transiciones están en TRANSICIONES_COLOR"
+        )
+    LAYOUTS_POR_COLOR.setdefault(color, []).append(layout_func)
+    if not repetir:
+        LAYOUTS_SIN_REPETIR.add(layout_func)
+    CAJA_IMAGEN_LAYOUT[layout_func] = caja_imagen
+
+
+def cajas_imagen():
+    """Cajas de imagen (ancho, alto) de los layouts del plan, sin repetir: para derivar_imagenes"""
+    return list(dict.fromkeys(
+        CAJA_IMAGEN_LAYOUT.get(layout_func, CAJA_IMAGEN_PREDETERMINADA)
+        for layouts in LAYOUTS_POR_COLOR.values() for layout_func in layouts
+    ))
+
+
+# -------------------------
+# 3. Plan y render por lotes
+# -------------------------
+def tabla_transiciones():
+    """
+    Layouts (en orden fijo) y tabla de probabilidades acumuladas de pasar de
+    cada layout al siguiente; la última fila es la primera página.
+
+    Desde un layout se elige primero un color permitido (todos con la misma
+    probabilidad) y luego un layout de ese color, descartando las
+    repeticiones prohibidas.
+    """
+    layouts = [f for funcs in LAYOUTS_POR_COLOR.values() for f in funcs]
+    color_de = {f: color for color, funcs in LAYOUTS_POR_COLOR.items() for f in funcs}
+    inicio = len(layouts)
+
+    pesos = np.zeros((inicio + 1, inicio))
+    for a in range(inicio + 1):
+        anterior = layouts[a] if a < inicio else None
+        destinos = TRANSICIONES_COLOR[color_de.get(anterior)]
+        for color in destinos:
+            for layout_func in LAYOUTS_POR_COLOR.get(color, ()):
+                if layout_func is anterior and layout_func in LAYOUTS_SIN_REPETIR:
+                    continue
+                b = layouts.index(layout_func)
+                pesos[a, b] += 1 / len(destinos) / len(LAYOUTS_POR_COLOR[color])
+
+    sin_salida = [
+        layouts[a].__name__ if a < inicio else "inicio"
+        for a in np.flatnonzero(pesos.sum(axis=1) == 0)
+    ]
+    if sin_salida:
+        raise ValueError(f"Layouts sin ningún layout permitido a continuación: {sin_salida}")
+
+    acumulada = np.cumsum(pesos / pesos.sum(axis=1, keepdims=True), axis=1)
+    return layouts, acumulada
+
+
+def _uniformes(claves, semilla, canal):
+    """
+    Un número en [0, 1) por clave, estable (splitmix64 de semilla, canal y
+    clave): no depende del orden, del proceso ni de PYTHONHASHSEED.
+    """
+    x = np.asarray(claves, dtype=np.int64).view(np.uint64)
+    with np.errstate(over="ignore"):
+        x = x ^ np.uint64((semilla * 0x9E3779B97F4A7C15 + canal) & 0xFFFFFFFFFFFFFFFF)
+        for _ in range(2):
+            x = x + np.uint64(0x9E3779B97F4A7C15)
+            x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)) * (1.0 / (1 << 53))
+
+
+def planear_paginas(claves, imagenes, semilla=0, anterior=None):
+    """
+    Layout e imagen de la página de cada tarea (``claves``: Tarea_Project_Key
+    en el orden del libro), en una sola pasada vectorizada. La imagen llega
+    al layout como ImagenPagina (src, srcset, sizes y medidas para la caja
+    que ocupa en ese layout), elegida solo entre las que tienen derivada
+    para esa caja (ver derivar_imagenes): un retrato nunca cae en una doble
+    página ni una foto chica en una caja que la agrande.
+
+    Cada tarea tiene sus propios números aleatorios (semilla + clave): con
+    los mismos datos, imágenes y semilla el plan es siempre el mismo, y
+    agregar o quitar una tarea no cambia la imagen de las demás. El layout
+    sigue la tabla de transiciones a partir del de la página ``anterior``
+    (para continuar un plan por bloques).
+    """
+    layouts, acumulada = tabla_transiciones()
+    total = len(claves)
+    if total == 0:
+        return []
+
+    # Cada página es una función estado -> estado (estado = índice del
+    # layout anterior); se eligen todas a la vez...
+    u_layout = _uniformes(claves, semilla, 1)
+    transicion = np.empty((total, len(acumulada)), dtype=np.intp)
+    for estado, fila in enumerate(acumulada):
+        transicion[:, estado] = np.searchsorted(fila, u_layout, side="right")
+    np.minimum(transicion, len(layouts) - 1, out=transicion)
+
+    # ...y se componen con un scan prefijo (log2(total) pasos): compuesta[i]
+    # lleva el estado inicial al layout de la página i
+    compuesta = transicion
+    paso = 1
+    while paso < total:
+        compuesta[paso:] = np.take_along_axis(compuesta[paso:], compuesta[:-paso], axis=1)
+        paso *= 2
+
+    inicio = len(layouts) if anterior is None else layouts.index(anterior)
+    secuencia = compuesta[:, inicio]
+
+    cajas = [CAJA_IMAGEN_LAYOUT.get(f, CAJA_IMAGEN_PREDETERMINADA) for f in layouts]
+    u_img = _uniformes(claves, semilla, 2)
+    indices_img = np.zeros(total, dtype=np.intp)
+    for l, caja in enumerate(cajas):
+        en_layout = secuencia == l
+        if not en_layout.any():
+            continue
+        # Imágenes que van en la caja de este layout (todas si ninguna)
+        candidatas = np.array(
+            [i for i, imagen in enumerate(imagenes) if va_en(imagen, caja)]
+            or range(len(imagenes)),
+            dtype=np.intp,
+        )
+        indices_img[en_layout] = candidatas[(u_img[en_layout] * len(candidatas)).astype(np.intp)]
+    # Una ImagenPagina por combinación de layout e imagen, compartida entre páginas
+    por_combinacion = {}
+    plan = []
+    for l, i in zip(secuencia.tolist(), indices_img.tolist()):
+        img_url = por_combinacion.get((l, i))
+        if img_url is None:
+            img_url = por_combinacion[(l, i)] = imagen_pagina(imagenes[i], cajas[l])
+        plan.append((layouts[l], img_url))
+    return plan
+
+
+def renderizar_lote(lote):
+    """HTML de cada página de un lote de (valores, layout_func, img_url); corre en los procesos del pool"""
+    return [layout_func(Tarea(*valores), img_url) for valores, layout_func, img_url in lote]
+
+
+def _lotes(filas, plan, tamano_lote):
+    lote = []
+    for valores, (layout_func, img_url) in zip(filas, plan):
+        lote.append((valores, layout_func, img_url))
+        if len(lote) == tamano_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _completar(pendiente, cache):
+    paginas, faltantes, claves, renderizadas = pendiente
+    if hasattr(renderizadas, "result"):
+        renderizadas = renderizadas.result()
+    for i, html in zip(faltantes, renderizadas):
+        paginas[i] = html
+    if cache is not None and faltantes:
+        cache.guardar([claves[i] for i in faltantes], renderizadas)
+    return ''.join(paginas)
+
+
+def renderizar_paginas(df, plan, pool=None, tamano_lote=250, cache=None):
+    """
+    Entrega, en orden, el HTML de las páginas de tareas según ``plan``
+    (un bloque de texto por lote).
+
+    Sin ``pool`` se renderiza en este proceso. Con un ProcessPoolExecutor los
+    lotes se reparten entre sus procesos y se reensamblan en el orden
+    original; solo hay unos pocos lotes en vuelo por proceso, así la memoria
+    no crece con el tamaño del libro.
+
+    Con ``cache`` (flipbook_cache.CachePaginas) solo se renderizan las
+    páginas que no están en caché; el resto se toma tal cual.
+    """
+    max_en_vuelo = 2 * (os.cpu_count() or 1) if pool is not None else 0
+    en_vuelo = deque()
+    # Huellas de todas las filas de una vez (vectorizado), para las claves
+    huellas = cache.huellas_filas(df) if cache is not None else None
+
+    for n, lote in enumerate(_lotes(filas_tarea(df), plan, tamano_lote)):
+        if cache is not None:
+            claves = cache.claves(lote, huellas[n * tamano_lote:(n + 1) * tamano_lote])
+            paginas = cache.buscar(claves)
+        else:
+            claves, paginas = None, [None] * len(lote)
+        faltantes = [i for i, html in enumerate(paginas) if html is None]
+        por_renderizar = [lote[i] for i in faltantes]
+
+        if pool is None or not por_renderizar:
+            renderizadas = renderizar_lote(por_renderizar)
+        else:
+            renderizadas = pool.submit(renderizar_lote, por_renderizar)
+        en_vuelo.append((paginas, faltantes, claves, renderizadas))
+
+        if len(en_vuelo) > max_en_vuelo:
+            yield _completar(en_vuelo.popleft(), cache)
+    while en_vuelo:
+        yield _completar(en_vuelo.popleft(), cache)
+
+
+def archivos_render():
+    """
+    Código y plantillas que determinan el HTML (para la huella del build):
+    todos los módulos flipbook_*.py, no solo los layouts (las cifras y la
+    narrativa, el marcado de las imágenes y el minificador también).
+    """
+    return archivos_codigo() + archivos_plantillas()
@@ -0,0 +1,145 @@
+import ast
+import builtins
+import hashlib
+import importlib.util
+import logging
+import marshal
+import os
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# 1. Configuración
+# -------------------------
+# Plantillas HTML editables (sintaxis de f-string: {tarea.Codigo_Tarea},
+# {tarea.porcentaje:.0f}, llaves literales como {{ }})
+CARPETA_PLANTILLAS = Path(
+    os.environ.get("FLIPBOOK_PLANTILLAS", Path(__file__).parent / "plantillas")
+)
+# Bytecode compilado de cada plantilla (se puede borrar sin riesgo)
+CACHE_PLANTILLAS = os.environ.get("FLIPBOOK_CACHE_PLANTILLAS", ".cache/plantillas")
+
+
+# -------------------------
+# 2. Compilación
+# -------------------------
+class Plantilla:
+    """
+    Una plantilla compilada a una función de Python equivalente a la f-string
+    original: ``render(**valores)`` devuelve el HTML.
+
+    ``huella`` (sha256 del contenido) identifica la versión de la plantilla;
+    las cachés de páginas la usan en su clave para que un cambio invalide solo
+    las páginas hechas con esta plantilla.
+    """
+
+    __slots__ = ("nombre", "ruta", "parametros", "huella", "render")
+
+    def __init__(self, nombre, ruta, parametros, huella, render):
+        self.nombre = nombre
+        self.ruta = ruta
+        self.parametros = parametros
+        self.huella = huella
+        self.render = render
+
+    def __call__(self, *args, **kwargs):
+        return self.render(*args, **kwargs)
+
+
+def _fuente_python(nombre, texto, parametros):
+    """Código de la función render(...) que devuelve la plantilla como f-string"""
+    cuerpo = texto.replace("\\", "\\\\").replace('"""', '\\"\\"\\"')
+    if cuerpo.endswith('"'):
+        cuerpo = cuerpo[:-1] + '\\"'
+    fuente = f'def {nombre}({", ".join(parametros)}):\n    return f"""{cuerpo}"""\n'
+
+    # Los nombres usados en la plantilla deben ser parámetros (o builtins):
+    # un error de escritura se detecta al compilar, no al renderizar
+    try:
+        arbol = ast.parse(fuente)
+    except SyntaxError as e:
+        raise ValueError(f"Plantilla {nombre}: sintaxis inválida ({e.msg})") from e
+    desconocidos = {
+        n.id for n in ast.walk(arbol)
+        if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Load)
+    } - set(parametros) - set(dir(builtins))
+    if desconocidos:
+        raise ValueError(
+            f"Plantilla {nombre}: variables no declaradas {sorted(desconocidos)} "
+            f"(parámetros: {list(parametros)})"
+        )
+    return fuente
+
+
+def _ruta_bytecode(nombre, fuente):
+    if not CACHE_PLANTILLAS:
+        return None
+    # El magic number cambia con la versión de Python, igual que en __pycache__
+    digest = hashlib.sha256(importlib.util.MAGIC_NUMBER + fuente.encode("utf-8")).hexdigest()
+    return Path(CACHE_PLANTILLAS) / f"{nombre}.{digest[:16]}.bin"
+
+
+def _compilar(nombre, ruta, fuente):
+    ruta_bin = _ruta_bytecode(nombre, fuente)
+
+    if ruta_bin is not None and ruta_bin.exists():
+        try:
+            return marshal.loads(ruta_bin.read_bytes())
+        except (EOFError, ValueError, TypeError):
+            logger.warning(f"⚠️  Bytecode dañado para {nombre}, se recompila")
+
+    codigo = compile(fuente, str(ruta), "exec")
+
+    if ruta_bin is not None:
+        ruta_bin.parent.mkdir(parents=True, exist_ok=True)
+        # Versiones anteriores de esta misma plantilla ya no sirven
+        for viejo in ruta_bin.parent.glob(f"{nombre}.*.bin"):
+            viejo.unlink(missing_ok=True)
+        tmp = ruta_bin.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(marshal.dumps(codigo))
+        os.replace(tmp, ruta_bin)
+
+    return codigo
+
+
+# -------------------------
+# 3. Caché por proceso
+# -------------------------
+_compiladas = {}
+_lock = threading.Lock()
+
+
+def cargar_plantilla(nombre, parametros, modulo=None):
+    """
+    Compila ``plantillas/<nombre>.html`` (una vez por proceso) a una
+    función ``nombre(*parametros)``.
+
+    Con ``modulo`` la función queda registrada como ``modulo.nombre``, así
+    se puede enviar a otros procesos (pickle) como cualquier función.
+    """
+    parametros = tuple(parametros)
+    ruta = CARPETA_PLANTILLAS / f"{nombre}.html"
+    texto = ruta.read_text(encoding="utf-8")
+    huella = hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+    clave = (nombre, parametros, huella, modulo)
+    with _lock:
+        plantilla = _compiladas.get(clave)
+        if plantilla is None:
+            fuente = _fuente_python(nombre, texto, parametros)
+            espacio = {}
+            exec(_compilar(nombre, ruta, fuente), espacio)
+            render = espacio[nombre]
+            render.huella = huella
+            if modulo is not None:
+                render.__module__ = modulo
+            plantilla = Plantilla(nombre, ruta, parametros, huella, render)
+            _compiladas[clave] = plantilla
+    return plantilla
+
+
+def archivos_plantillas():
+    """Rutas de todas las plantillas (para la huella del build)"""
+    return sorted(str(p) for p in CARPETA_PLANTILLAS.glob("*.html"))
@@ -0,0 +1,479 @@
+import pandas as pd
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# 1. Huella del build
+# -------------------------
+# CSS/JS que enlaza el HTML generado
+RECURSOS_ESTATICOS = [
+    "css/enhanced-flipbook.css",
+    "extras/jquery.min.1.7.js",
+    "extras/modernizr.2.5.3.min.js",
+    "lib/turn.min.js",
+]
+
+
+def archivos_codigo():
+    """
+    Módulos flipbook_*.py (para la huella del build): datos y estadísticas,
+    imágenes, layouts, plantillas y esta salida determinan el HTML.
+    """
+    return sorted(str(p) for p in Path(__file__).parent.glob("flipbook_*.py"))
+
+
+class HuellaFilas:
+    """
+    Huella del contenido, columnas y tipos de un DataFrame que puede llegar
+    por bloques (p. ej. en streaming): agregar los bloques en orden da lo
+    mismo que agregar el DataFrame entero.
+    """
+
+    def __init__(self):
+        self._h = None
+
+    def agregar(self, df):
+        if self._h is None:
+            self._h = hashlib.sha256()
+            self._h.update(repr(list(zip(df.columns, df.dtypes.astype(str)))).encode("utf-8"))
+        self._h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+        return self
+
+    def digest(self):
+        return self._h.digest() if self._h is not None else b""
+
+
+def huella_build(dataframes=(), archivos=(), carpetas=(), parametros=None):
+    """
+    Huella (sha256) de todo lo que determina el HTML:
+
+    - ``dataframes``: filas extraídas y agregados (contenido, columnas y
+      tipos), como DataFrame o HuellaFilas
+    - ``archivos``: CSS/JS y código de los generadores (por contenido)
+    - ``carpetas``: catálogo de imágenes (nombre, tamaño y fecha de cada archivo)
+    - ``parametros``: opciones del build que cambian el HTML (p. ej. la semilla)
+    """
+    h = hashlib.sha256()
+
+    if parametros:
+        h.update(repr(sorted(parametros.items())).encode("utf-8"))
+
+    for df in dataframes:
+        if not isinstance(df, HuellaFilas):
+            df = HuellaFilas().agregar(df)
+        h.update(df.digest())
+
+    for archivo in archivos:
+        h.update(str(archivo).encode("utf-8"))
+        if os.path.exists(archivo):
+            with open(archivo, "rb") as f:
+                h.update(hashlib.sha256(f.read()).digest())
+
+    for carpeta in carpetas:
+        if not os.path.isdir(carpeta):
+            continue
+        entradas = sorted(
+            (e.name, e.stat().st_size, e.stat().st_mtime_ns)
+            for e in os.scandir(carpeta) if e.is_file()
+        )
+        h.update(repr((str(carpeta), entradas)).encode("utf-8"))
+
+    return h.hexdigest()
+
+
+def ruta_manifiesto(output):
+    return Path(output).with_suffix(".manifest.json")
+
+
+def build_actualizado(output, huella, comprimido=False):
+    """
+    True si ``output`` existe y su manifiesto tiene la misma huella,
+    es decir, regenerarlo produciría el mismo libro. Con ``comprimido``
+    también debe existir ``output.gz``.
+    """
+    manifiesto = ruta_manifiesto(output)
+    if not os.path.exists(output) or not manifiesto.exists():
+        return False
+    if comprimido and not os.path.exists(f"{output}.gz"):
+        return False
+    try:
+        return json.loads(manifiesto.read_text(encoding="utf-8")).get("huella") == huella
+    except ValueError:
+        return False
+
+
+def guardar_manifiesto(output, huella, **extra):
+    manifiesto = ruta_manifiesto(output)
+    contenido = {
+        "output": Path(output).name,
+        "huella": huella,
+        "generado": datetime.now().isoformat(timespec="seconds"),
+        **extra,
+    }
+    manifiesto.write_text(json.dumps(contenido, indent=2, ensure_ascii=False), encoding="utf-8")
+    return manifiesto
+
+
+def ruta_plan(output):
+    return Path(output).with_suffix(".plan.json")
+
+
+class PlanPaginas:
+    """
+    Escribe el plan de páginas (ver guardar_plan) a medida que se planea,
+    bloque por bloque, sin retenerlo en memoria. Va a un temporal que
+    reemplaza al plan anterior al salir del with sin errores.
+
+        with PlanPaginas(output, semilla) as escritor:
+            for bloque in bloques:
+                escritor.agregar(claves, plan)
+    """
+
+    def __init__(self, output, semilla):
+        self.ruta = ruta_plan(output)
+        self._encabezado = {"output": Path(output).name, "semilla": semilla}
+        self._tmp = self.ruta.with_suffix(f".{os.getpid()}.tmp")
+        self._f = None
+        self.paginas = 0
+
+    def __enter__(self):
+        self._f = open(self._tmp, "w", encoding="utf-8")
+        # Mismo JSON que json.dumps(indent=2) del plan completo
+        encabezado = json.dumps(self._encabezado, indent=2, ensure_ascii=False)
+        self._f.write(encabezado[:-2] + ',\n  "paginas": [')
+        return self
+
+    def agregar(self, claves, plan):
+        for clave, (layout_func, img_url) in zip(claves, plan):
+            pagina = json.dumps(
+                {"tarea": int(clave), "layout": layout_func.__name__, "imagen": str(img_url)},
+                indent=2, ensure_ascii=False,
+            )
+            self._f.write(("," if self.paginas else "") + "\n    " + pagina.replace("\n", "\n    "))
+            self.paginas += 1
+
+    def __exit__(self, tipo, valor, traza):
+        self._f.write(("\n  ]" if self.paginas else "]") + "\n}")
+        self._f.close()
+        if tipo is None:
+            os.replace(self._tmp, self.ruta)
+        else:
+            self._tmp.unlink(missing_ok=True)
+        return False
+
+
+def guardar_plan(output, claves, plan, semilla):
+    """
+    Guarda junto al libro el plan de páginas: layout e imagen asignados a
+    cada tarea, en orden (para revisar o comparar builds).
+    """
+    with PlanPaginas(output, semilla) as escritor:
+        escritor.agregar(claves, plan)
+    return escritor.ruta
+
+
+# -------------------------
+# 2. Minificación
+# -------------------------
+# Comentarios, bloques cuyo contenido no se toca, etiquetas y texto
+_TOKENS_HTML = re.compile(
+    r"(<!--.*?-->)|(<(script|style|pre|textarea)\b.*?</\3\s*>)|(<[^>]*>)|([^<]+|<)",
+    re.S | re.I,
+)
+_ESTILO_EN_ETIQUETA = re.compile(r'\sstyle="([^"]*)"', re.I)
+_CLASE_EN_ETIQUETA = re.compile(r'(\sclass=")([^"]*)"', re.I)
+_ETIQUETA_MARCADA = re.compile(r"(<[^<>]*?)\x00(\d+)\x00(/?>)")
+_DECLARACIONES = re.compile(r";(?![^(]*\))")
+_ESPACIOS = re.compile(r"\s+")
+_APERTURA_BLOQUE = re.compile(r"<!--|<(script|style|pre|textarea)\b", re.I)
+
+
+class Minificador:
+    """
+    Reduce el HTML sin cambiar lo que se ve, en dos pasadas por streaming:
+
+    1. ``minificar(fragmento)``: colapsa espacios en blanco a uno solo (no
+       los elimina: entre elementos en línea son visibles), quita
+       comentarios (salvo condicionales ``<!--[if``) y deja intactos
+       ``<script>``, ``<style>``, ``<pre>`` y ``<textarea>``. Cada atributo
+       ``style`` se reemplaza por una marca y se cuenta.
+    2. ``resolver(fragmento)``: los estilos que se repiten ``minimo`` veces
+       o más pasan a una clase generada (``.fs-<hash>``, con ``!important``
+       para conservar la prioridad del estilo en línea), cuyas reglas se
+       insertan antes de ``</head>``; el resto vuelve a ser ``style="..."``.
+
+    Los fragmentos pueden cortar etiquetas o scripts en cualquier punto
+    (p. ej. copias por bloques de bytes): lo incompleto se guarda para el
+    siguiente y ``terminar()`` devuelve lo que quede al final.
+    """
+
+    def __init__(self, minimo=2):
+        self.minimo = minimo
+        self.bytes_entrada = 0
+        self.bytes_salida = 0
+        self._estilos = {}
+        self._conteo = []
+        self._clases = None
+        self._por_indice = None
+        self._css_insertado = False
+        self._espacio = False
+        self._pendiente = ""
+
+    def _marcar(self, etiqueta):
+        coincidencia = _ESTILO_EN_ETIQUETA.search(etiqueta)
+        if coincidencia is None:
+            return etiqueta
+        estilo = coincidencia.group(1).strip().rstrip(";").strip()
+        indice = self._estilos.setdefault(estilo, len(self._estilos))
+        if indice == len(self._conteo):
+            self._conteo.append(0)
+        self._conteo[indice] += 1
+        resto = etiqueta[:coincidencia.start()] + etiqueta[coincidencia.end():]
+        cierre = "/>" if resto.endswith("/>") else ">"
+        return f"{resto[:-len(cierre)].rstrip()}\x00{indice}\x00{cierre}"
+
+    def _corte(self, texto):
+        """Posición desde la que ``texto`` puede estar incompleto"""
+        corte = len(texto)
+        inicio_etiqueta = texto.rfind("<")
+        if inicio_etiqueta >= 0 and ">" not in texto[inicio_etiqueta:]:
+            corte = inicio_etiqueta
+        posicion = 0
+        while True:
+            apertura = _APERTURA_BLOQUE.search(texto, posicion, corte)
+            if apertura is None:
+                return corte
+            nombre = apertura.group(1)
+            fin = re.compile("-->" if nombre is None else rf"</{nombre}\s*>", re.I)
+            cierre = fin.search(texto, apertura.end())
+            if cierre is None:
+                return apertura.start()
+            posicion = cierre.end()
+
+    def minificar(self, fragmento):
+        self.bytes_entrada += len(fragmento.encode("utf-8"))
+        texto = self._pendiente + fragmento
+        corte = self._corte(texto)
+        self._pendiente = texto[corte:]
+        return self._minificar(texto[:corte])
+
+    def terminar(self):
+        texto, self._pendiente = self._pendiente, ""
+        return self._minificar(texto)
+
+    def _minificar(self, fragmento):
+        partes = []
+        for comentario, bloque, _, etiqueta, texto in _TOKENS_HTML.findall(fragmento):
+            if comentario:
+                if not comentario.startswith("<!--[if"):
+                    continue
+                parte = comentario
+            elif bloque:
+                parte = bloque
+            elif etiqueta:
+                parte = self._marcar(_ESPACIOS.sub(" ", etiqueta))
+            else:
+                parte = _ESPACIOS.sub(" ", texto)
+                # Un solo espacio entre dos partes, aunque vengan de fragmentos distintos
+                if self._espacio and parte.startswith(" "):
+                    parte = parte[1:]
+                if not parte:
+                    continue
+            partes.append(parte)
+            self._espacio = parte.endswith(" ")
+        return "".join(partes)
+
+    def clases(self):
+        """Estilo → nombre de clase, para los estilos repetidos"""
+        if self._clases is None:
+            self._clases = {
+                estilo: "fs-" + hashlib.blake2b(estilo.encode("utf-8"), digest_size=4).hexdigest()
+                for estilo, indice in self._estilos.items()
+                if estilo and self._conteo[indice] >= self.minimo
+            }
+        return self._clases
+
+    def css(self):
+        reglas = []
+        for estilo, clase in self.clases().items():
+            declaraciones = [
+                [parte.strip() for parte in d.split(":", 1)]
+                for d in _DECLARACIONES.split(estilo) if ":" in d
+            ]
+            reglas.append(
+                f".{clase}{{"
+                + ";".join(f"{propiedad}:{valor} !important" for propiedad, valor in declaraciones)
+                + "}"
+            )
+        return f"<style>{''.join(reglas)}</style>" if reglas else ""
+
+    def _resolver_etiqueta(self, coincidencia):
+        etiqueta, indice, cierre = coincidencia.groups()
+        estilo = self._por_indice[int(indice)]
+        clase = self.clases().get(estilo)
+        if clase is None:
+            return f'{etiqueta} style="{estilo}"{cierre}'
+        existente = _CLASE_EN_ETIQUETA.search(etiqueta)
+        if existente is None:
+            return f'{etiqueta} class="{clase}"{cierre}'
+        clases = f"{existente.group(2)} {clase}".strip()
+        return (
+            f'{etiqueta[:existente.start()]}{existente.group(1)}{clases}"'
+            f"{etiqueta[existente.end():]}{cierre}"
+        )
+
+    def resolver(self, fragmento):
+        if self._por_indice is None:
+            self._por_indice = list(self._estilos)
+        fragmento = _ETIQUETA_MARCADA.sub(self._resolver_etiqueta, fragmento)
+        if not self._css_insertado:
+            posicion = fragmento.lower().find("</head>")
+            if posicion >= 0:
+                fragmento = fragmento[:posicion] + self.css() + fragmento[posicion:]
+                self._css_insertado = True
+        self.bytes_salida += len(fragmento.encode("utf-8"))
+        return fragmento
+
+    def resumen(self):
+        ahorro = 1 - self.bytes_salida / self.bytes_entrada if self.bytes_entrada else 0
+        return (
+            f"Minificado: {self.bytes_entrada / 1024:,.0f} KB → "
+            f"{self.bytes_salida / 1024:,.0f} KB (-{ahorro:.0%}), "
+            f"{len(self.clases())} estilos repetidos como clases"
+        )
+
+
+def _fragmentos_por_etiqueta(archivo, tamano=1 << 20):
+    """Lee ``archivo`` por bloques cortados después de un '>' (sin partir etiquetas)"""
+    pendiente = ""
+    while True:
+        bloque = archivo.read(tamano)
+        if not bloque:
+            break
+        pendiente += bloque
+        corte = pendiente.rfind(">") + 1
+        if corte:
+            yield pendiente[:corte]
+            pendiente = pendiente[corte:]
+    if pendiente:
+        yield pendiente
+
+
+# -------------------------
+# 3. Escritura del HTML
+# -------------------------
+class SalidaHTML:
+    """
+    Escribe el HTML por partes (cabecera, cada página, scripts) a un archivo
+    con buffer, sin armar el documento completo en memoria.
+
+    Se escribe a un temporal en la misma carpeta y solo al cerrar sin errores
+    se renombra (os.replace) a ``output``: quien abra el libro ve la versión
+    anterior o la nueva completa, nunca una a medias. Con ``comprimir`` se
+    escribe a la vez ``output.gz`` (para servidores con gzip estático).
+
+    Con ``minificar`` cada parte pasa por un Minificador a un borrador y al
+    cerrar se hace la segunda pasada (estilos repetidos → clases) hacia
+    ``output`` y ``output.gz``; el tamaño antes y después queda en
+    ``self.minificador.resumen()``.
+
+        with SalidaHTML(output) as f:
+            f.write(HTML_INICIO)
+            ...
+    """
+
+    def __init__(self, output, comprimir=False, buffer=1 << 20, minificar=False):
+        self.output = str(output)
+        self.comprimir = comprimir
+        self.buffer = buffer
+        self.minificador = Minificador() if minificar else None
+        self._archivos = []
+        self._borrador = None
+
+    def _abrir(self, destino, gz=False):
+        tmp = f"{destino}.{os.getpid()}.tmp"
+        crudo = open(tmp, "wb", buffering=self.buffer)
+        binario = crudo
+        if gz:
+            # Nombre final y mtime=0 en la cabecera (no el del temporal): el
+            # mismo HTML produce siempre el mismo .gz
+            binario = gzip.GzipFile(
+                filename=os.path.basename(destino), fileobj=crudo, mode="wb",
+                compresslevel=6, mtime=0,
+            )
+        texto = io.TextIOWrapper(binario, encoding="utf-8", newline="")
+        self._archivos.append((texto, crudo, tmp, destino))
+
+    def _abrir_destinos(self):
+        self._abrir(self.output)
+        if self.comprimir:
+            self._abrir(f"{self.output}.gz", gz=True)
+
+    def __enter__(self):
+        carpeta = os.path.dirname(self.output)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        if self.minificador is not None:
+            self._borrador = f"{self.output}.{os.getpid()}.min.tmp"
+            self._archivo_borrador = open(
+                self._borrador, "w", encoding="utf-8", newline="", buffering=self.buffer
+            )
+        else:
+            self._abrir_destinos()
+        return self
+
+    def write(self, texto):
+        if self._borrador is not None:
+            self._archivo_borrador.write(self.minificador.minificar(texto))
+            return
+        for archivo, *_ in self._archivos:
+            archivo.write(texto)
+
+    def _segunda_pasada(self):
+        self._abrir_destinos()
+        with open(self._borrador, encoding="utf-8", newline="") as borrador:
+            for fragmento in _fragmentos_por_etiqueta(borrador):
+                fragmento = self.minificador.resolver(fragmento)
+                for archivo, *_ in self._archivos:
+                    archivo.write(fragmento)
+
+    def __exit__(self, tipo, error, traza):
+        completo = tipo is None
+        try:
+            if self._borrador is not None:
+                self._archivo_borrador.write(self.minificador.terminar())
+                self._archivo_borrador.close()
+                if completo:
+                    self._segunda_pasada()
+        except BaseException:
+            completo = False
+            raise
+        finally:
+            if self._borrador is not None:
+                os.remove(self._borrador)
+                self._borrador = None
+            self._cerrar(completo)
+        return False
+
+    def _cerrar(self, completo):
+        for archivo, crudo, tmp, destino in self._archivos:
+            try:
+                # Cerrar el texto vacía el buffer y, si es gzip, escribe el final del stream
+                archivo.close()
+                crudo.close()
+                if completo:
+                    os.replace(tmp, destino)
+            finally:
+                # Con error (aquí o generando páginas) se descarta el temporal
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        self._archivos = []